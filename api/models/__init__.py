@@ -7,12 +7,16 @@ from api.models.food_analysis import (
     NutritionInfo,
     FoodAnalysisResult,
     FoodAnalysisRequest,
+    FoodBatchAnalysisRequest,
+    FoodBatchJob,
+    FoodBatchJobRequest,
     FoodCorrectionRequest,
 )
 
 from api.models.exercise_analysis import (
     ExerciseAnalysisResult,
     ExerciseAnalysisRequest,
+    ExerciseBatchAnalysisRequest,
     ExerciseCorrectionRequest,
 )
 
@@ -21,8 +25,12 @@ __all__ = [
     "NutritionInfo",
     "FoodAnalysisResult",
     "FoodAnalysisRequest",
+    "FoodBatchAnalysisRequest",
+    "FoodBatchJob",
+    "FoodBatchJobRequest",
     "FoodCorrectionRequest",
     "ExerciseAnalysisResult",
     "ExerciseAnalysisRequest",
+    "ExerciseBatchAnalysisRequest",
     "ExerciseCorrectionRequest",
 ]
@@ -4,7 +4,7 @@ Models for exercise analysis.
 
 import uuid
 from datetime import datetime
-from typing import Optional, Any
+from typing import List, Optional, Any
 from pydantic import BaseModel, Field
 
 
@@ -32,13 +32,33 @@ class ExerciseAnalysisRequest(BaseModel):
 
     description: str = Field(description="Description of the exercise to analyze")
     user_weight_kg: Optional[float] = Field(
-        default=None, description="User's weight in kilograms"
+        default=None, gt=0, description="User's weight in kilograms"
     )
     user_height_cm: Optional[float] = Field(
-        default=None, description="User's height in centimeters"
+        default=None, gt=0, description="User's height in centimeters"
     )
     user_age: Optional[int] = Field(
-        default=None, description="User's age in years"
+        default=None, gt=0, description="User's age in years"
+    )
+    user_gender: Optional[str] = Field(
+        default=None, description="User's gender (male/female)"
+    )
+
+
+class ExerciseBatchAnalysisRequest(BaseModel):
+    """Exercise analysis request model for analyzing several descriptions at once."""
+
+    descriptions: List[str] = Field(
+        min_length=1, max_length=20, description="Descriptions of the exercises to analyze"
+    )
+    user_weight_kg: Optional[float] = Field(
+        default=None, gt=0, description="User's weight in kilograms"
+    )
+    user_height_cm: Optional[float] = Field(
+        default=None, gt=0, description="User's height in centimeters"
+    )
+    user_age: Optional[int] = Field(
+        default=None, gt=0, description="User's age in years"
     )
     user_gender: Optional[str] = Field(
         default=None, description="User's gender (male/female)"
@@ -55,13 +75,13 @@ class ExerciseCorrectionRequest(BaseModel):
         description="User's feedback for correction"
     )
     user_weight_kg: Optional[float] = Field(
-        default=None, description="User's weight in kilograms"
+        default=None, gt=0, description="User's weight in kilograms"
     )
     user_height_cm: Optional[float] = Field(
-        default=None, description="User's height in centimeters"
+        default=None, gt=0, description="User's height in centimeters"
     )
     user_age: Optional[int] = Field(
-        default=None, description="User's age in years"
+        default=None, gt=0, description="User's age in years"
     )
     user_gender: Optional[str] = Field(
         default=None, description="User's gender (male/female)"
@@ -5,7 +5,7 @@ Food analysis models using Pydantic for FastAPI.
 from datetime import datetime
 from typing import Dict, List, Optional
 from uuid import uuid4
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Ingredient(BaseModel):
@@ -18,6 +18,8 @@ class Ingredient(BaseModel):
 class NutritionInfo(BaseModel):
     """Nutrition information model."""
 
+    model_config = ConfigDict(frozen=True)
+
     calories: float = Field(default=0, description="Calories in kcal")
     protein: float = Field(default=0, description="Protein in grams")
     carbs: float = Field(default=0, description="Carbohydrates in grams")
@@ -64,16 +66,61 @@ class FoodAnalysisResult(BaseModel):
 class FoodAnalysisRequest(BaseModel):
     """Food analysis request model for text-based analysis."""
 
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "description": "Grilled chicken breast with a side of mixed vegetables and brown rice"
+            }
+        }
+    )
+
     description: str = Field(description="Description of the food to analyze")
 
-    class Config:
-        """Pydantic model configuration."""
 
-        json_schema_extra = {
+class FoodBatchAnalysisRequest(BaseModel):
+    """Food analysis request model for analyzing several descriptions at once."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
-                "description": "Grilled chicken breast with a side of mixed vegetables and brown rice"
+                "descriptions": ["Nasi goreng with a fried egg", "Iced sweet tea"]
             }
         }
+    )
+
+    descriptions: List[str] = Field(
+        min_length=1, max_length=20, description="Descriptions of the foods to analyze"
+    )
+
+
+class FoodBatchJobRequest(BaseModel):
+    """Request model for submitting a bulk food analysis job."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "descriptions": ["Nasi goreng with a fried egg", "Iced sweet tea"]
+            }
+        }
+    )
+
+    descriptions: List[str] = Field(
+        min_length=1, max_length=1000, description="Descriptions of the foods to analyze"
+    )
+
+
+class FoodBatchJob(BaseModel):
+    """Status of a bulk food analysis job."""
+
+    id: str = Field(description="Identifier of the batch job")
+    state: str = Field(description="Gemini job state, e.g. JOB_STATE_RUNNING")
+    results: Optional[List[FoodAnalysisResult]] = Field(
+        default=None,
+        description="One result per description, in order, once the job has succeeded",
+    )
+    error: Optional[str] = Field(
+        default=None, description="Error message if the job failed"
+    )
 
 
 class FoodCorrectionRequest(BaseModel):
@@ -83,4 +130,4 @@ class FoodCorrectionRequest(BaseModel):
         description="Previous analysis result to correct"
     )
     user_comment: str = Field(description="User's feedback for correction")
-    servings: Optional[float] = Field(default=1.0, description="Number of servings")
\ No newline at end of file
+    servings: Optional[float] = Field(default=1.0, gt=0, description="Number of servings")
\ No newline at end of file
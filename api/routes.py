@@ -3,7 +3,9 @@ API routes for PockEat API.
 """
 
 import os
+import json
 import logging
+from typing import List, Optional
 
 from fastapi import (
     APIRouter,
@@ -14,6 +16,7 @@ from fastapi import (
     UploadFile,
     Form,
     Request,
+    Response,
 )
 from fastapi.responses import JSONResponse
 
@@ -22,11 +25,15 @@ from api.services.gemini.exceptions import GeminiServiceException
 from api.models.food_analysis import (
     FoodAnalysisResult,
     FoodAnalysisRequest,
+    FoodBatchAnalysisRequest,
+    FoodBatchJob,
+    FoodBatchJobRequest,
     FoodCorrectionRequest,
 )
 from api.models.exercise_analysis import (
     ExerciseAnalysisResult,
     ExerciseAnalysisRequest,
+    ExerciseBatchAnalysisRequest,
     ExerciseCorrectionRequest,
 )
 from api.dependencies.auth import get_current_user, verify_token, optional_verify_token
@@ -37,30 +44,72 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
-# Initialize service
-gemini_service = None
+# Largest image upload the analysis routes accept, in bytes
+MAX_IMAGE_UPLOAD_BYTES = 10 * 1024 * 1024
 
-try:
-    gemini_service = GeminiService()
-except Exception as e:  # pragma: no cover
-    logger.error(f"Failed to initialize Gemini service: {str(e)}")
-    gemini_service = None
+# Most images the batch image route sends to Gemini in one request
+MAX_IMAGES_PER_BATCH = 8
+
+# Shared service, created on first use rather than at import time
+gemini_service: Optional[GeminiService] = None
 
 
 # Dependency to get Gemini service
 async def get_gemini_service() -> GeminiService:
-    """Get Gemini service."""
-    if gemini_service is None:  # pragma: no cover
-        logger.error("Gemini service is unavailable for this request")
+    """Get the process-wide Gemini service, creating it on first use.
+
+    A failed initialization is retried on the next request, so the service
+    recovers once its configuration becomes available.
+
+    Returns:
+        The shared GeminiService instance.
+
+    Raises:
+        HTTPException: 503 if the service cannot be initialized.
+    """
+    global gemini_service
+    if gemini_service is None:
+        try:
+            gemini_service = GeminiService()
+        except Exception as e:
+            logger.error(f"Failed to initialize Gemini service: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Gemini service is unavailable",
+            )
+    return gemini_service
+
+
+def _ensure_image_size(image: UploadFile) -> None:
+    """Reject an upload larger than MAX_IMAGE_UPLOAD_BYTES before it is read.
+
+    Raises:
+        HTTPException: 413 if the image is too large.
+    """
+    if image.size is not None and image.size > MAX_IMAGE_UPLOAD_BYTES:
+        logger.warning(f"Rejected image upload of {image.size} bytes: {image.filename}")
         raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Gemini service is unavailable",
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Image must be at most {MAX_IMAGE_UPLOAD_BYTES // (1024 * 1024)} MB",
         )
-    return gemini_service
+
+
+# Health check bodies, encoded once since they only depend on Gemini availability
+_HEALTH_BODIES = {
+    True: json.dumps({"status": "healthy", "message": "API is running"}).encode(),
+    False: json.dumps(
+        {
+            "status": "degraded",
+            "message": "API is running, but Gemini service is unavailable",
+        }
+    ).encode(),
+}
 
 
 @router.get("/health", summary="Health check", tags=["Health"])
-async def health_check(gemini: GeminiService = Depends(get_gemini_service)):
+async def health_check(
+    gemini: GeminiService = Depends(get_gemini_service),
+) -> Response:
     """Health check endpoint."""
     is_gemini_available = await gemini.check_health()
 
@@ -69,11 +118,9 @@ async def health_check(gemini: GeminiService = Depends(get_gemini_service)):
     else:
         logger.debug("Health check: API is healthy")
 
-    return {
-        "status": "healthy" if is_gemini_available else "degraded",
-        "message": "API is running"
-        + ("" if is_gemini_available else ", but Gemini service is unavailable"),
-    }
+    return Response(
+        content=_HEALTH_BODIES[bool(is_gemini_available)], media_type="application/json"
+    )
 
 
 @router.post(
@@ -104,6 +151,83 @@ async def analyze_food_by_text(
         )
 
 
+@router.post(
+    "/food/analyze/batch",
+    response_model=List[FoodAnalysisResult],
+    summary="Analyze several foods from text",
+    tags=["Food"],
+)
+async def analyze_food_batch(
+    request: FoodBatchAnalysisRequest,
+    gemini: GeminiService = Depends(get_gemini_service),
+):
+    """Analyze several food descriptions concurrently in one request."""
+    logger.info(f"Analyzing food batch of {len(request.descriptions)} descriptions")
+    try:
+        results = await gemini.analyze_food_batch(request.descriptions)
+        logger.info(f"Successfully analyzed food batch of {len(results)} descriptions")
+        return results
+    except Exception as e:
+        logger.error(f"Failed to analyze food batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to analyze food batch: {str(e)}",
+        )
+
+
+@router.post(
+    "/food/batch-jobs",
+    response_model=FoodBatchJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit a bulk food analysis job",
+    tags=["Food"],
+)
+async def submit_food_batch_job(
+    request: FoodBatchJobRequest,
+    gemini: GeminiService = Depends(get_gemini_service),
+):
+    """Queue many food descriptions for analysis with Gemini Batch Mode.
+
+    Results are not returned here; poll the job until it has succeeded.
+    """
+    logger.info(f"Submitting food batch job of {len(request.descriptions)} descriptions")
+    try:
+        return await gemini.submit_food_batch_job(request.descriptions)
+    except GeminiServiceException as e:
+        logger.error(f"Gemini service error while submitting food batch job: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Failed to submit food batch job: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to submit food batch job: {str(e)}",
+        )
+
+
+@router.get(
+    "/food/batch-jobs/{job_id}",
+    response_model=FoodBatchJob,
+    summary="Get a bulk food analysis job",
+    tags=["Food"],
+)
+async def get_food_batch_job(
+    job_id: str,
+    gemini: GeminiService = Depends(get_gemini_service),
+):
+    """Get the state of a food batch job, with its results once it has succeeded."""
+    try:
+        return await gemini.get_food_batch_job(job_id)
+    except GeminiServiceException as e:
+        logger.error(f"Gemini service error while reading food batch job: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Failed to read food batch job: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read food batch job: {str(e)}",
+        )
+
+
 @router.post(
     "/food/analyze/image",
     response_model=FoodAnalysisResult,
@@ -115,6 +239,7 @@ async def analyze_food_by_image(
 ):
     """Analyze food from image."""
     logger.info(f"Analyzing food from image: {image.filename}")
+    _ensure_image_size(image)
     try:
         result = await gemini.analyze_food_by_image(image.file)
         logger.info(f"Successfully analyzed food image: {result.food_name}")
@@ -160,6 +285,38 @@ async def analyze_food_by_image(
         )
 
 
+@router.post(
+    "/food/analyze/image/batch",
+    response_model=List[FoodAnalysisResult],
+    summary="Analyze several foods from images",
+    tags=["Food"],
+)
+async def analyze_food_by_images(
+    images: List[UploadFile] = File(...),
+    gemini: GeminiService = Depends(get_gemini_service),
+):
+    """Analyze several food images with one model request."""
+    if len(images) > MAX_IMAGES_PER_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IMAGES_PER_BATCH} images can be analyzed at once",
+        )
+    for image in images:
+        _ensure_image_size(image)
+
+    logger.info(f"Analyzing food batch of {len(images)} images")
+    try:
+        results = await gemini.analyze_food_by_images([image.file for image in images])
+        logger.info(f"Successfully analyzed food batch of {len(results)} images")
+        return results
+    except Exception as e:
+        logger.error(f"Failed to analyze food image batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to analyze food image batch: {str(e)}",
+        )
+
+
 @router.post(
     "/food/analyze/nutrition-label",
     response_model=FoodAnalysisResult,
@@ -168,13 +325,14 @@ async def analyze_food_by_image(
 )
 async def analyze_nutrition_label(
     image: UploadFile = File(...),
-    servings: float = Form(1.0),
+    servings: float = Form(1.0, gt=0),
     gemini: GeminiService = Depends(get_gemini_service),
 ):
     """Analyze nutrition label from image."""
     logger.info(
         f"Analyzing nutrition label from image: {image.filename}, servings: {servings}"
     )
+    _ensure_image_size(image)
     try:
         result = await gemini.analyze_nutrition_label(image.file, servings)
         logger.info(f"Successfully analyzed nutrition label: {result.food_name}")
@@ -229,6 +387,36 @@ async def analyze_exercise(
         )
 
 
+@router.post(
+    "/exercise/analyze/batch",
+    response_model=List[ExerciseAnalysisResult],
+    summary="Analyze several exercises",
+    tags=["Exercise"],
+)
+async def analyze_exercise_batch(
+    request: ExerciseBatchAnalysisRequest,
+    gemini: GeminiService = Depends(get_gemini_service),
+):
+    """Analyze several exercise descriptions for one user concurrently."""
+    logger.info(f"Analyzing exercise batch of {len(request.descriptions)} descriptions")
+    try:
+        results = await gemini.analyze_exercise_batch(
+            request.descriptions,
+            request.user_weight_kg,
+            request.user_height_cm,
+            request.user_age,
+            request.user_gender,
+        )
+        logger.info(f"Successfully analyzed exercise batch of {len(results)} descriptions")
+        return results
+    except Exception as e:
+        logger.error(f"Failed to analyze exercise batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to analyze exercise batch: {str(e)}",
+        )
+
+
 @router.post(
     "/food/correct/text",
     response_model=FoodAnalysisResult,
@@ -256,7 +444,12 @@ async def correct_food_text_analysis(
         )
 
 
-@router.post("/exercise/correct")
+@router.post(
+    "/exercise/correct",
+    response_model=ExerciseAnalysisResult,
+    summary="Correct exercise analysis",
+    tags=["Exercise"],
+)
 async def correct_exercise_analysis(
     request: ExerciseCorrectionRequest,
     gemini: GeminiService = Depends(get_gemini_service),
@@ -2,34 +2,146 @@
 Base service class for Gemini API integration using LangChain.
 """
 
-import base64
+import asyncio
+import hashlib
 import os
-import binascii
 import logging
-from typing import Dict, Any, cast
+import weakref
+from contextlib import aclosing
+from types import MappingProxyType
+from typing import Dict, Any, Final, List, Mapping, Optional, Tuple, Type, cast
+from google.api_core.exceptions import (
+    BadGateway,
+    DeadlineExceeded,
+    InternalServerError,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
 from pydantic import SecretStr
+from tenacity import (
+    AsyncRetrying,
+    before_sleep_log,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
 
+from api.services.gemini.cache import ResponseCache
 from api.services.gemini.exceptions import GeminiAPIKeyMissingError, InvalidImageError
+from api.services.gemini.utils.json_parser import JsonCompletionScanner, try_parse_json_fast
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Transient Gemini errors (429, 500, 502, 503, 504) worth retrying
+_RETRYABLE_ERRORS: Final[Tuple[Type[Exception], ...]] = (
+    ResourceExhausted,
+    InternalServerError,
+    BadGateway,
+    ServiceUnavailable,
+    DeadlineExceeded,
+)
+
+# Generation settings shared by every model the services create. Every prompt
+# asks for JSON, so JSON mode makes Gemini return it without fences or prose
+# and responses take the parsers' fast path. Retries are handled by
+# _stream_model, so the client's own fixed-backoff retries are turned off.
+_GENERATION_CONFIG: Final[Mapping[str, Any]] = MappingProxyType(
+    {"temperature": 0.1, "response_mime_type": "application/json", "max_retries": 1}
+)
+
+
+# Above this many image bytes, hashing runs in a worker thread so it does not
+# stall the event loop (hashlib releases the GIL while hashing)
+_INLINE_HASH_LIMIT: Final[int] = 256 * 1024
+
+
+# Model calls allowed in flight at once when GEMINI_MAX_INFLIGHT is unset or invalid
+_DEFAULT_MAX_INFLIGHT_REQUESTS: Final[int] = 32
+
+
+def _read_max_inflight_requests() -> int:
+    """Read GEMINI_MAX_INFLIGHT, falling back to the default if it is not a positive integer."""
+    value = os.getenv("GEMINI_MAX_INFLIGHT")
+    if value is None:
+        return _DEFAULT_MAX_INFLIGHT_REQUESTS
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        logger.warning(
+            f"Ignoring invalid GEMINI_MAX_INFLIGHT={value!r}, "
+            f"using {_DEFAULT_MAX_INFLIGHT_REQUESTS}"
+        )
+        return _DEFAULT_MAX_INFLIGHT_REQUESTS
+    return limit
+
+
+# Model calls allowed in flight at once on each event loop, across all
+# services, so bursts and batch endpoints queue locally instead of tripping
+# Gemini's rate limits
+_MAX_INFLIGHT_REQUESTS: Final[int] = _read_max_inflight_requests()
+
+# Model calls in flight per event loop, shared by every service instance
+_inflight_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# Leading bytes of the image formats Gemini accepts, checked in order;
+# anything unrecognized is sent as JPEG
+_IMAGE_SIGNATURES: Final[Tuple[Tuple[bytes, int, str], ...]] = (
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+    (b"WEBP", 8, "image/webp"),
+    (b"ftypheic", 4, "image/heic"),
+    (b"ftypheif", 4, "image/heif"),
+    (b"ftypmif1", 4, "image/heif"),
+)
+
+
+def _image_mime_type(image: bytes) -> str:
+    """Return the MIME type of an image from its leading bytes.
+
+    Upload content types are often missing or wrong, and a PNG or WEBP image
+    labelled as JPEG can be rejected by Gemini, costing a retry.
+    """
+    for signature, offset, mime_type in _IMAGE_SIGNATURES:
+        if image.startswith(signature, offset):
+            return mime_type
+    return "image/jpeg"
+
+
+def _image_digests(images: List[bytes]) -> List[str]:
+    """Hash each image for use in a cache key."""
+    return [hashlib.blake2b(image, digest_size=16).hexdigest() for image in images]
+
 
 class BaseLangChainService:
     """Base service for Gemini services using LangChain."""
 
+    # Attempts per model call, including the first, and the cap in seconds on
+    # the jittered exponential wait between them
+    max_attempts: int = 4
+    retry_max_wait: float = 8.0
+
     def __init__(
         self,
         text_model_name: str = "models/gemini-1.5-pro",
         multimodal_model_name: str = "models/gemini-1.5-pro",
+        text_llm: Optional[BaseChatModel] = None,
+        multimodal_llm: Optional[BaseChatModel] = None,
     ):
         """Initialize the service.
 
         Args:
             text_model_name: The name of the text model.
             multimodal_model_name: The name of the multimodal model.
+            text_llm: An existing text model to reuse, sharing its connection pool.
+            multimodal_llm: An existing multimodal model to reuse.
 
         Raises:
             GeminiAPIKeyMissingError: If the API key is not set in environment variables.
@@ -51,25 +163,47 @@ class BaseLangChainService:
         )
 
         # Create text LLM
-        self.text_llm = ChatGoogleGenerativeAI(
-            model=self.text_model_name, api_key=SecretStr(api_key), temperature=0.1
+        self.text_llm = text_llm or ChatGoogleGenerativeAI(
+            model=self.text_model_name,
+            api_key=SecretStr(api_key),
+            **_GENERATION_CONFIG,
         )
 
         # Create multimodal LLM
-        self.multimodal_llm = ChatGoogleGenerativeAI(
+        self.multimodal_llm = multimodal_llm or ChatGoogleGenerativeAI(
             model=self.multimodal_model_name,
             api_key=SecretStr(api_key),
-            temperature=0.1,
+            **_GENERATION_CONFIG,
         )
 
-    def _read_image_bytes(self, image_file) -> str:
-        """Read the image bytes from a file and return base64 encoding.
+        # Multimodal responses keyed by model, prompt and image, so a re-sent
+        # photo or label skips the upload and the Gemini call
+        self._multimodal_cache: ResponseCache[str] = ResponseCache(maxsize=2048, ttl=600.0)
+
+    async def aclose(self) -> None:
+        """Close the models' async gRPC channels.
+
+        Models shared with other services are closed for them too, so this
+        should only be called once the whole service layer is shutting down.
+        """
+        llms = [self.text_llm]
+        if self.multimodal_llm is not self.text_llm:
+            llms.append(self.multimodal_llm)
+
+        for llm in llms:
+            async_client = getattr(llm, "async_client_running", None)
+            if async_client is not None:
+                await async_client.transport.close()
+                llm.async_client_running = None
+
+    def _read_image_bytes(self, image_file) -> bytes:
+        """Read the image bytes from a file.
 
         Args:
             image_file: The image file (file-like object).
 
         Returns:
-            The base64-encoded image bytes.
+            The raw image bytes.
 
         Raises:
             InvalidImageError: If the image cannot be processed.
@@ -90,27 +224,8 @@ class BaseLangChainService:
                 logger.error("Empty image file received")
                 raise InvalidImageError("Image file is empty")
 
-            # Encode as base64
-            b64_bytes = base64.b64encode(image_content)
-            b64_string = b64_bytes.decode("utf-8")
-
-            # Ensure valid padding
-            padding = 4 - (len(b64_string) % 4) if len(b64_string) % 4 else 0
-            b64_string = b64_string + ("=" * padding)
-
-            # Validate the result by trying to decode it (catch bad encodings)
-            try:
-                base64.b64decode(b64_string)
-            except binascii.Error as e:  # pragma: no cover
-                logger.error(f"Invalid base64 encoding: {str(e)}")
-                raise InvalidImageError(
-                    "Generated invalid base64 string. Check image data."
-                )
-
-            logger.debug(
-                f"Successfully encoded image file to base64 (length: {len(b64_string)})"
-            )
-            return b64_string
+            logger.debug(f"Successfully read image file ({len(image_content)} bytes)")
+            return image_content
 
         except InvalidImageError as e:
             # Re-raise specific image errors
@@ -119,11 +234,70 @@ class BaseLangChainService:
             logger.error(f"Error in _read_image_bytes: {str(e)}")
             raise InvalidImageError(f"Failed to process image: {str(e)}")
 
-    async def _invoke_text_model(self, prompt: str) -> str:
+    async def _stream_model(
+        self, llm: BaseChatModel, messages: List[BaseMessage], **kwargs: Any
+    ) -> str:
+        """Stream a model response, stopping once the JSON payload is complete.
+
+        Chunks are collected as they arrive and scanned for the end of the
+        first top-level JSON value, so parsing can start without waiting for
+        any trailing text the model generates after it.
+
+        Transient Gemini errors are retried up to ``max_attempts`` times with
+        jittered exponential backoff, so concurrent requests hitting a rate
+        limit do not retry in lockstep. Each attempt restarts the stream.
+
+        Args:
+            llm: The chat model to stream from.
+            messages: The messages to send to the model.
+            kwargs: Per-call generation options, such as ``response_schema``.
+
+        Returns:
+            The streamed response text.
+        """
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+            wait=wait_random_exponential(multiplier=0.5, max=self.retry_max_wait),
+            stop=stop_after_attempt(self.max_attempts),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        ):
+            with attempt:
+                return await self._stream_model_once(llm, messages, **kwargs)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def _stream_model_once(
+        self, llm: BaseChatModel, messages: List[BaseMessage], **kwargs: Any
+    ) -> str:
+        """Stream one model response until its JSON payload is complete."""
+        chunks: List[str] = []
+        scanner = JsonCompletionScanner()
+        async with self._inflight_slot():
+            async with aclosing(llm.astream(messages, **kwargs)) as stream:
+                async for chunk in stream:
+                    text = cast(str, chunk.content)
+                    chunks.append(text)
+                    if scanner.feed(text):
+                        break
+        return "".join(chunks)
+
+    def _inflight_slot(self) -> asyncio.Semaphore:
+        """Return the semaphore bounding concurrent model calls on this event loop."""
+        loop = asyncio.get_running_loop()
+        slots = _inflight_slots.get(loop)
+        if slots is None:
+            slots = _inflight_slots[loop] = asyncio.Semaphore(_MAX_INFLIGHT_REQUESTS)
+        return slots
+
+    async def _invoke_text_model(
+        self, prompt: str, response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
         """Invoke the text model with a prompt.
 
         Args:
             prompt: The prompt to send to the model.
+            response_schema: OpenAPI-style schema Gemini's JSON output must
+                follow, or None for free-form JSON.
 
         Returns:
             The model's response as a string.
@@ -131,44 +305,72 @@ class BaseLangChainService:
         try:
             logger.debug(f"Invoking text model with prompt: {prompt[:100]}...")
             human_message = HumanMessage(content=prompt)
-            response = await self.text_llm.ainvoke([human_message])
-            print(f"AI API Response (Text Model): {response.content[:500]}...")
-            return cast(str, response.content)
+            kwargs = {} if response_schema is None else {"response_schema": response_schema}
+            response_text = await self._stream_model(self.text_llm, [human_message], **kwargs)
+            logger.debug(f"AI API Response (Text Model): {response_text[:500]}...")
+            return response_text
         except Exception as e:
             logger.error(f"Error invoking text model: {str(e)}")
             raise
 
-    async def _invoke_multimodal_model(
-        self, text_prompt: str, image_base64: str
-    ) -> str:
+    async def _invoke_multimodal_model(self, text_prompt: str, image: bytes) -> str:
         """Invoke the multimodal model with text and image.
 
         Args:
             text_prompt: The text prompt to send to the model.
-            image_base64: The base64-encoded image.
+            image: The raw image bytes.
+
+        Returns:
+            The model's response as a string.
+        """
+        return await self._invoke_multimodal_model_with_images(text_prompt, [image])
+
+    async def _invoke_multimodal_model_with_images(
+        self, text_prompt: str, images: List[bytes]
+    ) -> str:
+        """Invoke the multimodal model with text and one or more images in one request.
+
+        Args:
+            text_prompt: The text prompt to send to the model.
+            images: The raw image bytes, in the order the prompt refers to them.
 
         Returns:
             The model's response as a string.
         """
+        if sum(map(len, images)) > _INLINE_HASH_LIMIT:
+            image_digests = await asyncio.to_thread(_image_digests, images)
+        else:
+            image_digests = _image_digests(images)
+        cache_key = ResponseCache.make_key(
+            self.multimodal_model_name, text_prompt, *image_digests
+        )
+        cached = self._multimodal_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Multimodal response served from cache")
+            return cached
+
         try:
             logger.debug(
                 f"Invoking multimodal model with prompt: {text_prompt[:100]}..."
             )
 
-            # Create multipart message with image and text
-            human_message = HumanMessage(
-                content=[
-                    {"type": "text", "text": text_prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
-                    },
-                ]
+            # Create multipart message with the text followed by every image.
+            # Media parts carry the raw bytes straight into the request, where
+            # a base64 data URL would be built here only to be decoded again.
+            content: List[Any] = [{"type": "text", "text": text_prompt}]
+            content.extend(
+                {"type": "media", "mime_type": _image_mime_type(image), "data": image}
+                for image in images
             )
+            human_message = HumanMessage(content=content)
+
+            response_text = await self._stream_model(self.multimodal_llm, [human_message])
+            logger.debug(f"AI API Response (Multimodal Model): {response_text[:500]}...")
 
-            response = await self.multimodal_llm.ainvoke([human_message])
-            print(f"AI API Response (Multimodal Model): {response.content[:500]}...")
-            return cast(str, response.content)
+            # Only well-formed JSON is cached, so a garbled reply is retried
+            if try_parse_json_fast(response_text) is not None:
+                self._multimodal_cache.set(cache_key, response_text)
+            return response_text
         except Exception as e:
             logger.error(f"Error invoking multimodal model: {str(e)}")
             raise
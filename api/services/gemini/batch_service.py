@@ -0,0 +1,161 @@
+"""
+Bulk food analysis through Gemini Batch Mode.
+"""
+
+import asyncio
+import logging
+import os
+from types import MappingProxyType
+from typing import Any, Final, FrozenSet, List, Mapping, Optional
+
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from api.models.food_analysis import FoodAnalysisResult, FoodBatchJob
+from api.services.gemini.exceptions import GeminiAPIError, GeminiAPIKeyMissingError
+from api.services.gemini.food_service import FoodAnalysisService
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Gemini names batch jobs "batches/<id>"; the API only exposes the id
+_JOB_NAME_PREFIX: Final[str] = "batches/"
+
+# Job states in which the inlined responses can be read
+_FINISHED_STATES: Final[FrozenSet[genai_types.JobState]] = frozenset(
+    {
+        genai_types.JobState.JOB_STATE_SUCCEEDED,
+        genai_types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    }
+)
+
+# Same generation settings as the interactive text model
+_REQUEST_CONFIG: Final[Mapping[str, Any]] = MappingProxyType(
+    {"temperature": 0.1, "response_mime_type": "application/json"}
+)
+
+
+class FoodBatchJobService:
+    """Run bulk food text analyses as Gemini batch jobs.
+
+    Batch jobs are scheduled by Gemini instead of answered immediately, and
+    are billed at half the interactive price. All requests of a job are sent
+    inline in one call, and the results are read back by polling the job, so
+    a bulk analysis costs two round trips instead of one per description.
+    """
+
+    # Maximum number of prompts built at once. Each one makes a food-name
+    # extraction call and several Supabase lookups, and sixteen fill one
+    # batched extraction call.
+    prompt_concurrency: int = 16
+
+    def __init__(
+        self, food_service: FoodAnalysisService, client: Optional[genai.Client] = None
+    ) -> None:
+        """Initialize the service.
+
+        Args:
+            food_service: Builds the prompts and parses the responses.
+            client: An existing Gemini client to use; one is created on first use otherwise.
+        """
+        self.food_service = food_service
+        self._client = client
+
+    def _get_client(self) -> genai.Client:
+        """Get the Gemini client, creating it on first use.
+
+        Raises:
+            GeminiAPIKeyMissingError: If the API key is not set in environment variables.
+        """
+        if self._client is None:
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise GeminiAPIKeyMissingError()
+            self._client = genai.Client(api_key=api_key)
+        return self._client
+
+    async def submit(self, descriptions: List[str]) -> FoodBatchJob:
+        """Submit a batch job analyzing every description.
+
+        Args:
+            descriptions: The food descriptions.
+
+        Returns:
+            The newly created job.
+
+        Raises:
+            GeminiAPIError: If Gemini rejects the job.
+        """
+        semaphore = asyncio.Semaphore(self.prompt_concurrency)
+
+        async def build_prompt(description: str) -> str:
+            async with semaphore:
+                return await self.food_service.build_text_analysis_prompt(description)
+
+        prompts = await asyncio.gather(*(build_prompt(d) for d in descriptions))
+        requests = [
+            {
+                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "config": dict(_REQUEST_CONFIG),
+            }
+            for prompt in prompts
+        ]
+        try:
+            job = await self._get_client().aio.batches.create(
+                model=self.food_service.text_model_name,
+                src=requests,
+                config={"display_name": f"food-analysis-{len(requests)}"},
+            )
+        except genai_errors.APIError as e:
+            logger.error(f"Failed to create food batch job: {str(e)}")
+            raise GeminiAPIError(e.message or str(e), status_code=e.code)
+
+        logger.info(f"Created food batch job {job.name} with {len(requests)} requests")
+        return await self._to_batch_job(job)
+
+    async def get(self, job_id: str) -> FoodBatchJob:
+        """Get the state of a batch job, with its results once it has succeeded.
+
+        Args:
+            job_id: The job identifier returned by ``submit``.
+
+        Returns:
+            The job.
+
+        Raises:
+            GeminiAPIError: If the job cannot be read, e.g. it does not exist.
+        """
+        try:
+            job = await self._get_client().aio.batches.get(name=_JOB_NAME_PREFIX + job_id)
+        except genai_errors.APIError as e:
+            logger.error(f"Failed to get food batch job {job_id}: {str(e)}")
+            raise GeminiAPIError(e.message or str(e), status_code=e.code)
+        return await self._to_batch_job(job)
+
+    async def _to_batch_job(self, job: genai_types.BatchJob) -> FoodBatchJob:
+        """Convert a Gemini batch job, parsing its responses if it has finished."""
+        state = job.state or genai_types.JobState.JOB_STATE_UNSPECIFIED
+        batch_job = FoodBatchJob(
+            id=(job.name or "").removeprefix(_JOB_NAME_PREFIX),
+            state=state.value,
+            error=job.error.message if job.error else None,
+        )
+        if state in _FINISHED_STATES:
+            responses = (job.dest.inlined_responses if job.dest else None) or []
+            batch_job.results = list(
+                await asyncio.gather(*(self._parse_response(r) for r in responses))
+            )
+        return batch_job
+
+    async def _parse_response(
+        self, response: genai_types.InlinedResponse
+    ) -> FoodAnalysisResult:
+        """Parse one inlined response, turning a per-request failure into an error result."""
+        if response.error is not None:
+            return FoodAnalysisResult(food_name="Unknown", error=response.error.message)
+
+        text = response.response.text if response.response else None
+        if not text:
+            return FoodAnalysisResult(food_name="Unknown", error="Empty response from Gemini")
+        return await self.food_service.parse_analysis_response(text, "Unknown")
@@ -0,0 +1,97 @@
+"""
+In-process response caching for Gemini API services.
+"""
+
+import hashlib
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Generic, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize Unicode forms, case and whitespace so equivalent inputs share a key.
+
+    Args:
+        text: The user-provided text.
+
+    Returns:
+        The normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+class ResponseCache(Generic[V]):
+    """A TTL cache with least-recently-used eviction.
+
+    Entries expire ``ttl`` seconds after they are stored. When the cache holds
+    ``maxsize`` entries, storing another evicts the least recently used one.
+    All operations are synchronous, so the cache is safe to share between
+    coroutines on one event loop without a lock.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600.0) -> None:
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept.
+            ttl: Seconds an entry stays valid after it is stored.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from one or more strings.
+
+        Args:
+            parts: The values identifying the cached response.
+
+        Returns:
+            A SHA-256 hex digest of the parts.
+        """
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value for a key, or None if missing or expired.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached value, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        """Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: The cache key.
+            value: The value to cache.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including expired ones."""
+        return len(self._entries)
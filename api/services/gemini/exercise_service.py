@@ -2,28 +2,157 @@
 Exercise analysis service using Gemini API.
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Final, Optional
+
+import orjson
+from langchain_core.language_models import BaseChatModel
 
 from api.services.gemini.base_service import BaseLangChainService
 from api.services.gemini.exceptions import GeminiServiceException
 from api.services.gemini.utils.json_parser import (
     extract_json_from_text,
     parse_json_safely,
+    try_parse_embedded_json,
 )
+from api.services.gemini.utils.prompts import PreparedPrompt
 from api.models.exercise_analysis import ExerciseAnalysisResult
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Shape Gemini's exercise JSON must follow. Enforced server side, so the
+# prompts only need to describe how to fill the fields in.
+_EXERCISE_RESPONSE_SCHEMA: Final[Dict[str, Any]] = {
+    "type": "object",
+    "properties": {
+        "exercise_type": {"type": "string"},
+        "calories_burned": {"type": "number"},
+        "duration": {"type": "string"},
+        "intensity": {"type": "string", "enum": ["Low", "Medium", "High", "unknown"]},
+        "met_value": {"type": "number"},
+        "error": {"type": "string"},
+    },
+    "required": ["exercise_type", "calories_burned", "duration", "intensity", "met_value"],
+    "propertyOrdering": [
+        "exercise_type",
+        "calories_burned",
+        "duration",
+        "intensity",
+        "met_value",
+        "error",
+    ],
+}
+
+# Prompts are str.format templates built once at import time
+_EXERCISE_ANALYSIS_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
+        Analyze the following exercise description and provide detailed information.
+    First, evaluate if the description clearly mentions:
+    1. The type of exercise (what activity)
+    2. Duration of the exercise (how long)
+    3. Intensity of the exercise (how hard)
+
+    Return your response as a JSON object.
+    If ANY of these three elements are missing, set error to "Error in describing exercise",
+    exercise_type, duration and intensity to "unknown", and calories_burned and met_value to 0.
+
+    Otherwise, give a concise exercise_type based on the description, the duration as
+    "xx seconds/minutes/hours", exactly ONE intensity, and the calories burned and MET value.
+
+    Exercise description: {description}
+
+    User health data: {health_info_str}
+
+    For calorie calculations, use the Mifflin-St Jeor equation to first calculate BMR:
+    - For males: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) + 5
+    - For females: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) – 161
+
+    Then calculate calories burned as: (BMR / 24) × MET value × duration in hours
+
+    Please identify the appropriate MET value for the exercise and include it in the response.
+    """
+)
+
+_EXERCISE_CORRECTION_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
+    I previously analyzed an exercise with description: "{original_input}"
+
+    Here is the previous analysis:
+    {previous_result_json}
+
+    The user has provided this feedback to correct or improve the analysis:
+    "{user_comment}"
+
+    User health data: {health_info_str}
+
+    Please correct the analysis based on this feedback. Return your corrected response as a complete JSON object with the same structure as the original analysis.
+    Estimate using a concrete proven formula to get the calories burned.
+    IMPORTANT: If the pace increases, you MUST INCREASE the MET. If the pace decreases, you MUST MAINTAIN the MET. UNLESS the user feedback explicitly mentions a different MET value.
+    
+    IMPORTANT: When user feedback only mentions correcting one parameter (e.g., only duration or only distance):
+    - If only duration is corrected, assume the same distance as originally stated
+    - If only distance is corrected, assume the same duration as originally stated
+
+    For calorie calculations, use the Mifflin-St Jeor equation to first calculate BMR:
+    - For males: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) + 5
+    - For females: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) – 161
+
+    Then calculate calories burned as: (BMR / 24) × MET value × duration in hours
+
+    RETURN THE OCORRECTED ANALYSIS JSON ONLY
+    """
+)
+
+
+def _format_health_info(
+    user_weight_kg: Optional[float],
+    user_height_cm: Optional[float],
+    user_age: Optional[int],
+    user_gender: Optional[str],
+    default: str,
+) -> str:
+    """Describe the provided user health metrics for a prompt.
+
+    Args:
+        user_weight_kg: The user's weight in kilograms.
+        user_height_cm: The user's height in centimeters.
+        user_age: The user's age in years.
+        user_gender: The user's gender.
+        default: Text to use when no metrics are provided.
+
+    Returns:
+        The comma-separated metrics, or ``default``.
+    """
+    health_info = []
+    if user_weight_kg:
+        health_info.append(f"Weight: {user_weight_kg} kg")
+    if user_height_cm:
+        health_info.append(f"Height: {user_height_cm} cm")
+    if user_age:
+        health_info.append(f"Age: {user_age} years")
+    if user_gender:
+        health_info.append(f"Gender: {user_gender}")
+
+    return ", ".join(health_info) if health_info else default
+
 
 class ExerciseAnalysisService(BaseLangChainService):
     """Exercise analysis service using Gemini API."""
 
-    def __init__(self):
-        """Initialize the service."""
-        super().__init__()
+    def __init__(
+        self,
+        text_llm: Optional[BaseChatModel] = None,
+        multimodal_llm: Optional[BaseChatModel] = None,
+    ):
+        """Initialize the service.
+
+        Args:
+            text_llm: An existing text model to reuse, sharing its connection pool.
+            multimodal_llm: An existing multimodal model to reuse.
+        """
+        super().__init__(text_llm=text_llm, multimodal_llm=multimodal_llm)
         logger.info("Initializing ExerciseAnalysisService")
 
     async def analyze(
@@ -61,11 +190,15 @@ class ExerciseAnalysisService(BaseLangChainService):
         )
         try:
             # Invoke the model
-            response_text = await self._invoke_text_model(prompt)
+            response_text = await self._invoke_text_model(
+                prompt, response_schema=_EXERCISE_RESPONSE_SCHEMA
+            )
             logger.debug(f"Received response: {response_text[:100]}...")
 
-            # Parse the response
-            return self._parse_exercise_analysis_response(response_text)
+            # Parse the response off the event loop
+            return await asyncio.to_thread(
+                self._parse_exercise_analysis_response, response_text
+            )
         except GeminiServiceException:
             # Re-raise GeminiServiceExceptions
             raise
@@ -93,7 +226,7 @@ class ExerciseAnalysisService(BaseLangChainService):
     ) -> ExerciseAnalysisResult:
         try:
             # Convert the previous result to a dict for the prompt
-            previous_result_dict = previous_result.dict(exclude={"timestamp", "id"})
+            previous_result_dict = previous_result.model_dump(exclude={"timestamp", "id"})
 
             # Generate the prompt for correction with health metrics
             prompt = self._generate_correction_prompt(
@@ -106,9 +239,13 @@ class ExerciseAnalysisService(BaseLangChainService):
             )
 
             # Rest of the method remains the same
-            response_text = await self._invoke_text_model(prompt)
+            response_text = await self._invoke_text_model(
+                prompt, response_schema=_EXERCISE_RESPONSE_SCHEMA
+            )
             logger.debug(f"Received correction response: {response_text[:100]}...")
-            corrected_result = self._parse_exercise_analysis_response(response_text)
+            corrected_result = await asyncio.to_thread(
+                self._parse_exercise_analysis_response, response_text
+            )
             corrected_result.id = previous_result.id
             return corrected_result
         except GeminiServiceException:
@@ -130,57 +267,16 @@ class ExerciseAnalysisService(BaseLangChainService):
         user_age: Optional[int] = None,
         user_gender: Optional[str] = None
     ) -> str:
-        # Create health metrics information string
-        health_info = []
-        if user_weight_kg:
-            health_info.append(f"Weight: {user_weight_kg} kg")
-        if user_height_cm:
-            health_info.append(f"Height: {user_height_cm} cm")
-        if user_age:
-            health_info.append(f"Age: {user_age} years")
-        if user_gender:
-            health_info.append(f"Gender: {user_gender}")
-        
-        health_info_str = ", ".join(health_info) if health_info else "Assume average adult metrics for calculations"
-
-        return f"""
-        Analyze the following exercise description and provide detailed information.
-    First, evaluate if the description clearly mentions:
-    1. The type of exercise (what activity)
-    2. Duration of the exercise (how long)
-    3. Intensity of the exercise (how hard)
-
-    If ANY of these three elements are missing, return this error format:
-    {{{{
-    "error": "Error in describing exercise",
-    "exercise_type": "unknown",
-    "calories_burned": 0,
-    "duration": "unknown",
-    "intensity": "unknown",
-    "met_value": 0.0
-    }}}}
-
-    Otherwise, if all elements are present, return your response as a JSON object with this structure (NOTE: Choose exactly ONE type of intensity):
-    {{{{
-    "exercise_type": "Concise name of exercise based on description",
-    "calories_burned": 0,
-    "duration": "xx seconds/minutes/hours",
-    "intensity": "Low/Medium/High",
-    "met_value": 0.0
-    }}}}
-
-    Exercise description: {description}
-
-    User health data: {health_info_str}
-
-    For calorie calculations, use the Mifflin-St Jeor equation to first calculate BMR:
-    - For males: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) + 5
-    - For females: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) – 161
-
-    Then calculate calories burned as: (BMR / 24) × MET value × duration in hours
-
-    Please identify the appropriate MET value for the exercise and include it in the response.
-    """
+        return _EXERCISE_ANALYSIS_PROMPT.format(
+            description=description,
+            health_info_str=_format_health_info(
+                user_weight_kg,
+                user_height_cm,
+                user_age,
+                user_gender,
+                default="Assume average adult metrics for calculations",
+            ),
+        )
 
     def _generate_correction_prompt(
         self, previous_result: Dict[str, Any],
@@ -191,52 +287,21 @@ class ExerciseAnalysisService(BaseLangChainService):
         user_gender: Optional[str] = None
     ) -> str:
         """Generate a prompt for correction."""
-        # Convert the previous result to a formatted JSON string
-        previous_result_json = json.dumps(previous_result, indent=2)
-        
-        # Extract original input if available
-        original_input = previous_result.get("original_input", "Unknown")
-        
-        # Create health metrics information string
-        health_info = []
-        if user_weight_kg:
-            health_info.append(f"Weight: {user_weight_kg} kg")
-        if user_height_cm:
-            health_info.append(f"Height: {user_height_cm} cm")
-        if user_age:
-            health_info.append(f"Age: {user_age} years")
-        if user_gender:
-            health_info.append(f"Gender: {user_gender}")
-        
-        health_info_str = ", ".join(health_info) if health_info else "No health metrics provided"
-
-        return f"""
-    I previously analyzed an exercise with description: "{original_input}"
-
-    Here is the previous analysis:
-    {previous_result_json}
-
-    The user has provided this feedback to correct or improve the analysis:
-    "{user_comment}"
-
-    User health data: {health_info_str}
-
-    Please correct the analysis based on this feedback. Return your corrected response as a complete JSON object with the same structure as the original analysis.
-    Estimate using a concrete proven formula to get the calories burned.
-    IMPORTANT: If the pace increases, you MUST INCREASE the MET. If the pace decreases, you MUST MAINTAIN the MET. UNLESS the user feedback explicitly mentions a different MET value.
-    
-    IMPORTANT: When user feedback only mentions correcting one parameter (e.g., only duration or only distance):
-    - If only duration is corrected, assume the same distance as originally stated
-    - If only distance is corrected, assume the same duration as originally stated
-
-    For calorie calculations, use the Mifflin-St Jeor equation to first calculate BMR:
-    - For males: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) + 5
-    - For females: BMR = (10 × weight [kg]) + (6.25 × height [cm]) – (5 × age [years]) – 161
-
-    Then calculate calories burned as: (BMR / 24) × MET value × duration in hours
-
-    RETURN THE OCORRECTED ANALYSIS JSON ONLY
-    """
+        # Convert the previous result to a compact JSON string
+        previous_result_json = orjson.dumps(previous_result).decode()
+
+        return _EXERCISE_CORRECTION_PROMPT.format(
+            original_input=previous_result.get("original_input", "Unknown"),
+            previous_result_json=previous_result_json,
+            user_comment=user_comment,
+            health_info_str=_format_health_info(
+                user_weight_kg,
+                user_height_cm,
+                user_age,
+                user_gender,
+                default="No health metrics provided",
+            ),
+        )
 
     def _parse_exercise_analysis_response(
         self, response_text: str
@@ -250,17 +315,21 @@ class ExerciseAnalysisService(BaseLangChainService):
             The exercise analysis result.
         """
         try:
-            print(f"Exercise Analysis Raw Response: {response_text}")
-            # Extract JSON from the response
-            json_str = extract_json_from_text(response_text)
-            if not json_str:  # pragma: no cover
-                logger.warning("No JSON found in response, returning raw response")
-                return self._create_error_result(
-                    f"Failed to parse response: {response_text[:100]}..."
-                )
-
-            # Parse the JSON
-            data = parse_json_safely(json_str)
+            logger.debug(f"Exercise Analysis Raw Response: {response_text}")
+            # Well-formed responses, even with surrounding text, skip
+            # extraction and repair entirely
+            data = try_parse_embedded_json(response_text)
+            if data is None:
+                # Extract JSON from the response
+                json_str = extract_json_from_text(response_text)
+                if not json_str:  # pragma: no cover
+                    logger.warning("No JSON found in response, returning raw response")
+                    return self._create_error_result(
+                        f"Failed to parse response: {response_text[:100]}..."
+                    )
+
+                # Parse the JSON
+                data = parse_json_safely(json_str)
 
             # Extract basic fields
             exercise_type = data.get("exercise_type", "unknown")
@@ -2,336 +2,254 @@
 Food analysis service using Gemini API.
 """
 
+import asyncio
+import io
 import os
 import json
 import logging
-from typing import Dict, Any, Optional, List, Tuple
+import re
+import weakref
+from typing import TYPE_CHECKING, Dict, Any, Final, FrozenSet, Optional, List, Tuple
 
-from supabase import create_client, Client
-from langchain.prompts import PromptTemplate
+import orjson
+from langchain_core.language_models import BaseChatModel
 from api.services.gemini.base_service import BaseLangChainService
 from api.services.gemini.exceptions import (
     GeminiServiceException,
     InvalidImageError,
 )
+from api.services.gemini.cache import ResponseCache, normalize_text
+from api.services.gemini.utils.batching import BatchingInvoker
 from api.services.gemini.utils.json_parser import (
     extract_json_from_text,
     parse_json_safely,
+    try_parse_embedded_json,
 )
+from api.services.gemini.utils.prompts import PreparedPrompt
 from api.models.food_analysis import FoodAnalysisResult, Ingredient, NutritionInfo
-from langchain.prompts import PromptTemplate
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-class FoodAnalysisService(BaseLangChainService):
-    """Food analysis service using Gemini API."""
-
-    # Constants for thresholds (kept for documentation purposes)
-    HIGH_SODIUM_THRESHOLD = 500  # mg
-    HIGH_SUGAR_THRESHOLD = 20.0  # g
-    HIGH_CHOLESTEROL_THRESHOLD = 200.0  # mg
-    HIGH_SATURATED_FAT_THRESHOLD = 5.0  # g
-
-    def __init__(self):
-        super().__init__()
-        self.supabase_url = os.environ.get("SUPABASE_URL")
-        self.supabase_key = os.environ.get("SUPABASE_KEY")
-        if not self.supabase_url or not self.supabase_key:
-            logger.warning("Supabase URL or Key not found in environment variables. RAG will be disabled.")
-            self.supabase_client: Optional[Client] = None
-        else:
-            self.supabase_client: Client = create_client(self.supabase_url, self.supabase_key)
-
-    async def _retrieve_relevant_food_data(self, query: str) -> Tuple[List[Dict[str, Any]], str]:
-        """Retrieve relevant food records from Supabase and generate context for RAG."""
-        if not self.supabase_client:
-            logger.warning("Supabase client not initialized, skipping RAG retrieval.")
-            return [], ""
-
-        try:
-            # Step 1: Ekstrak nama makanan dari input user pakai Gemini
-            extracted_food = await self._extract_food_names_with_gemini(query)
-            if not extracted_food:
-                return [], ""
-
-            # Step 2: Ambil data nutrisi dari Supabase
-            cleaned_data = []
-            context_lines = ["\n\nRelevant Nutrition Facts From Local DB:\n"]
-
-            for food_name in extracted_food:
-                response = self.supabase_client.table("nutrition_data") \
-                    .select("*") \
-                    .ilike("food", f"%{food_name}%") \
-                    .limit(1) \
-                    .execute()
-
-                if response.data:
-                    entry = response.data[0]
-
-                    # Build cleaned data
-                    nutrition_info = {
-                        "calories": entry.get("caloric_value", 0.0),
-                        "protein": entry.get("protein", 0.0),
-                        "carbs": entry.get("carbohydrates", 0.0),
-                        "fat": entry.get("fat", 0.0),
-                        "saturated_fat": entry.get("saturated_fats", 0.0),
-                        "sodium": entry.get("sodium", 0.0),
-                        "fiber": entry.get("dietary_fiber", 0.0),
-                        "sugar": entry.get("sugars", 0.0),
-                        "cholesterol": entry.get("cholesterol", 0.0),
-                        "nutrition_density": entry.get("nutrition_density", 0.0),
-                        "vitamins_and_minerals": {
-                            "vitamin_a": entry.get("vitamin_a", 0.0),
-                            "vitamin_b1": entry.get("vitamin_b1", 0.0),
-                            "vitamin_b11": entry.get("vitamin_b11", 0.0),
-                            "vitamin_b12": entry.get("vitamin_b12", 0.0),
-                            "vitamin_b2": entry.get("vitamin_b2", 0.0),
-                            "vitamin_b3": entry.get("vitamin_b3", 0.0),
-                            "vitamin_b5": entry.get("vitamin_b5", 0.0),
-                            "vitamin_b6": entry.get("vitamin_b6", 0.0),
-                            "vitamin_c": entry.get("vitamin_c", 0.0),
-                            "vitamin_d": entry.get("vitamin_d", 0.0),
-                            "vitamin_e": entry.get("vitamin_e", 0.0),
-                            "vitamin_k": entry.get("vitamin_k", 0.0),
-                            "calcium": entry.get("calcium", 0.0),
-                            "copper": entry.get("copper", 0.0),
-                            "iron": entry.get("iron", 0.0),
-                            "magnesium": entry.get("magnesium", 0.0),
-                            "manganese": entry.get("manganese", 0.0),
-                            "phosphorus": entry.get("phosphorus", 0.0),
-                            "potassium": entry.get("potassium", 0.0),
-                            "selenium": entry.get("selenium", 0.0),
-                            "zinc": entry.get("zinc", 0.0)
-                        }
-                    }
-
-                    cleaned_data.append({
-                        "food_name": entry["food"],
-                        "nutrition_info": nutrition_info
-                    })
-
-                    # Add to RAG context
-                    context_lines.append(f"- Food: {entry['food']}")
-                    for k, v in nutrition_info.items():
-                        if k == "vitamins_and_minerals":
-                            context_lines.append("  Vitamins and minerals:")
-                            for vk, vv in v.items():
-                                context_lines.append(f"    - {vk}: {vv}")
-                        else:
-                            context_lines.append(f"  {k.replace('_', ' ').capitalize()}: {v}")
-                    context_lines.append("")
-
-            context_str = "\n".join(context_lines)
-            return cleaned_data, context_str
-
-        except Exception as e:
-            logger.error(f"Failed to retrieve relevant food data: {str(e)}")
-            return [], ""
-
-
-    async def analyze_by_text(self, description: str) -> FoodAnalysisResult:
-        """Analyze food from a text description, using RAG if relevant data exists.
-
-        Args:
-            description: The food description.
-
-        Returns:
-            The food analysis result.
-        """
-
-        # Step 1: Try to retrieve context from Supabase
-        _, context = await self._retrieve_relevant_food_data(description)
-        # Step 2: Inject description and context into prompt
-        try:
-            prompt_text = self._generate_food_text_analysis_prompt(description=description, context=context)
-            prompt = PromptTemplate(input_variables=["description", "context"], template=prompt_text)
-            formatted_prompt = prompt.format(description=description, context=context)
-
-            # Step 3: Call Gemini model
-            response_text = await self._invoke_text_model(formatted_prompt)
-
-            # Step 4: Parse result
-            return self._parse_food_analysis_response(response_text, default_food_name=description)
-        except GeminiServiceException:
-            raise
-        except Exception as e:
-            logger.error(f"Error in analyze_by_text with RAG: {str(e)}")
-            return FoodAnalysisResult(
-                food_name="Unknown",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=f"Failed to analyze food text: {str(e)}"
-            )
+# Wrapping noise Gemini sometimes puts around JSON responses
+_RESPONSE_NOISE_RE: Final[re.Pattern[str]] = re.compile(
+    r"\A(?:\s|\ufeff|```|<\?.*?\?>)*(?:json\n)?"  # leading whitespace, fences, headers
+    r"|(?:\s|```)+\Z"  # trailing whitespace and fences
+    r"|\ufeff"  # stray byte order marks
+    r"|<\?xml[^>]*\?>",  # embedded XML declarations
+    re.IGNORECASE | re.DOTALL,
+)
 
-    async def analyze_by_image(self, image_file) -> FoodAnalysisResult:
-        """Analyze food from an image.
+# Numeric NutritionInfo fields read from Gemini's nutrition_info object
+_NUTRITION_FIELDS: Final[Tuple[str, ...]] = (
+    "calories",
+    "protein",
+    "carbs",
+    "fat",
+    "saturated_fat",
+    "sodium",
+    "fiber",
+    "sugar",
+    "cholesterol",
+    "nutrition_density",
+)
 
-        Args:
-            image_file: The image file (file-like object).
+# Float defaults for fields missing from Gemini's response
+_NUTRITION_DEFAULTS: Final[Dict[str, float]] = dict.fromkeys(_NUTRITION_FIELDS, 0.0)
 
-        Returns:
-            The food analysis result.
+# Shared by every error result; NutritionInfo is frozen so this is never mutated
+_EMPTY_NUTRITION_INFO: Final[NutritionInfo] = NutritionInfo()
 
-        Raises:
-            GeminiServiceException: If the analysis fails.
-        """
-        if not image_file:
-            error_message = "No image file provided"
-            logger.error(error_message)
-            return FoodAnalysisResult(
-                food_name="Unknown",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=error_message,
-            )
 
-        try:
-            # Read image bytes
-            image_base64 = self._read_image_bytes(image_file)
+# Supabase clients shared across service instances, keyed by (url, key). A
+# client's connections belong to the event loop it was created on, so the
+# clients and the lock guarding their creation are kept per loop.
+_SUPABASE_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_SUPABASE_CLIENT_LOCKS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
 
-            # Generate the prompt for food image analysis
-            prompt = self._generate_food_image_analysis_prompt()
+# nutrition_data column backing each NutritionInfo field, in prompt context order
+_DB_NUTRITION_COLUMNS: Final[Dict[str, str]] = {
+    "calories": "caloric_value",
+    "protein": "protein",
+    "carbs": "carbohydrates",
+    "fat": "fat",
+    "saturated_fat": "saturated_fats",
+    "sodium": "sodium",
+    "fiber": "dietary_fiber",
+    "sugar": "sugars",
+    "cholesterol": "cholesterol",
+    "nutrition_density": "nutrition_density",
+}
+
+# nutrition_data columns reported as vitamins and minerals
+_DB_VITAMIN_COLUMNS: Final[Tuple[str, ...]] = (
+    "vitamin_a",
+    "vitamin_b1",
+    "vitamin_b11",
+    "vitamin_b12",
+    "vitamin_b2",
+    "vitamin_b3",
+    "vitamin_b5",
+    "vitamin_b6",
+    "vitamin_c",
+    "vitamin_d",
+    "vitamin_e",
+    "vitamin_k",
+    "calcium",
+    "copper",
+    "iron",
+    "magnesium",
+    "manganese",
+    "phosphorus",
+    "potassium",
+    "selenium",
+    "zinc",
+)
 
-            # Invoke the multimodal model
-            response_text = await self._invoke_multimodal_model(prompt, image_base64)
+# Only the columns the RAG context uses are fetched from Supabase
+_DB_SELECT_COLUMNS: Final[str] = ",".join(
+    ("food", *_DB_NUTRITION_COLUMNS.values(), *_DB_VITAMIN_COLUMNS)
+)
 
-            # Parse the response
-            return self._parse_food_analysis_response(response_text, "image")
-        except InvalidImageError as e:
-            # Handle image processing errors
-            logger.error(f"Invalid image error: {str(e)}")
-            return FoodAnalysisResult(
-                food_name="Unknown",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=str(e),
-            )
-        except Exception as e:  # pragma: no cover
-            logger.error(f"Error in analyze_by_image: {str(e)}")
-            error_message = f"Failed to analyze food image: {str(e)}"
 
-            # Return result with error
-            return FoodAnalysisResult(
-                food_name="Unknown",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=error_message,
-            )
+# Food names extracted by Gemini, keyed by a hash of the normalized description
+_FOOD_NAME_CACHE: ResponseCache[List[str]] = ResponseCache(maxsize=4096, ttl=3600.0)
 
-    async def analyze_nutrition_label(
-        self, image_file, servings: float = 1.0
-    ) -> FoodAnalysisResult:
-        """Analyze a nutrition label image.
+# Filler words that do not change which foods a description mentions
+_DESCRIPTION_FILLER_WORDS: Final[FrozenSet[str]] = frozenset({
+    # English
+    "a", "an", "and", "ate", "eat", "eating", "for", "had", "have", "i", "just",
+    "me", "my", "some", "the", "today", "with",
+    # Indonesian
+    "aku", "dan", "dengan", "hari", "ini", "makan", "minum", "pakai", "sama",
+    "saya", "tadi", "yang",
+})
+_DESCRIPTION_WORD_RE: Final[re.Pattern[str]] = re.compile(r"\w+")
 
-        Args:
-            image_file: The image file (file-like object).
-            servings: The number of servings.
 
-        Returns:
-            The food analysis result.
+def _food_name_similarity_key(description: str) -> Optional[str]:
+    """Build a cache key shared by descriptions that differ only in phrasing.
 
-        Raises:
-            GeminiServiceException: If the analysis fails.
-        """
-        if not image_file:  # pragma: no cover
-            error_message = "No image file provided"
-            logger.error(error_message)
-            return FoodAnalysisResult(
-                food_name="Nutrition Label",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=error_message,
-            )   
-        try:
-            # Read image bytes
-            image_base64 = self._read_image_bytes(image_file)
+    The key is the sorted set of words left after dropping filler words, so
+    "ate nasi goreng" and "I ate nasi goreng today" map to the same entry.
 
-            # Generate the prompt for nutrition label analysis
-            prompt = self._generate_nutrition_label_prompt(servings)
+    Args:
+        description: The normalized user description.
 
-            # Invoke the multimodal model
-            response_text = await self._invoke_multimodal_model(prompt, image_base64)
+    Returns:
+        The cache key, or None if the description has no content words.
+    """
+    words = {
+        word
+        for word in _DESCRIPTION_WORD_RE.findall(description)
+        if word not in _DESCRIPTION_FILLER_WORDS
+    }
+    if not words:
+        return None
+    return "similar:" + ResponseCache.make_key(" ".join(sorted(words)))
 
-            # Parse the response
-            return self._parse_food_analysis_response(response_text, "Nutrition Label")
-        except InvalidImageError as e:
-            # Handle image processing errors
-            logger.error(f"Invalid image error: {str(e)}")  # pragma: no cover
-            return FoodAnalysisResult(  # pragma: no cover
-                food_name="Nutrition Label",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=str(e),
-            )
-        except Exception as e:  # pragma: no cover
-            logger.error(f"Error in analyze_nutrition_label: {str(e)}")
-            error_message = f"Failed to analyze nutrition label: {str(e)}"
 
-            # Return result with error
-            return FoodAnalysisResult(
-                food_name="Nutrition Label",
-                ingredients=[],
-                nutrition_info=NutritionInfo(),
-                error=error_message,
-            )
+def _get_cached_food_names(key: str) -> Optional[List[str]]:
+    """Return a copy of the cached food names for a key, or None if missing or expired."""
+    cached = _FOOD_NAME_CACHE.get(key)
+    return None if cached is None else list(cached)
 
-    async def correct_analysis(
-        self, previous_result: FoodAnalysisResult, user_comment: str
-    ) -> FoodAnalysisResult:
-        """Correct a previous food analysis based on user feedback.
 
-        Args:
-            previous_result: The previous food analysis result.
-            user_comment: The user's feedback.
+def _cache_food_names(key: str, food_names: List[str]) -> None:
+    """Store a copy of the food names for a key."""
+    _FOOD_NAME_CACHE.set(key, list(food_names))
 
-        Returns:
-            The corrected food analysis result.
 
-        Raises:
-            GeminiServiceException: If the correction fails.
-        """
+def _to_float(value: Any) -> float:
+    """Convert a JSON number or numeric string to float, skipping floats already parsed."""
+    return value if type(value) is float else float(value)
 
-        # Convert the previous result to a dict for the prompt
-        previous_result_dict = previous_result.dict(exclude={"timestamp", "id"})
 
-        # Generate the prompt for correction
-        prompt = self._generate_correction_prompt(previous_result_dict, user_comment)
+def _coerce_vitamins_and_minerals(values: Any) -> Dict[str, float]:
+    """Convert vitamin and mineral values to floats, dropping unconvertible entries.
 
-        try:
-            # Invoke the model
-            response_text = await self._invoke_text_model(prompt)
+    Args:
+        values: The vitamins_and_minerals object from the parsed response.
 
-            # Parse the response
-            corrected_result = self._parse_food_analysis_response(
-                response_text, previous_result.food_name
-            )
+    Returns:
+        Mapping of nutrient name to value.
+    """
+    if not isinstance(values, dict):
+        return {}
+
+    vitamins_and_minerals = {}
+    for key, value in values.items():
+        # JSON numbers need no exception handling; only strings can fail to parse
+        if isinstance(value, (int, float)):
+            vitamins_and_minerals[key] = float(value)
+            continue
+        if isinstance(value, str):
+            try:
+                vitamins_and_minerals[key] = float(value)
+                continue
+            except ValueError:
+                pass
+        logger.warning(f"Could not convert {key} value to float: {value}")
+    return vitamins_and_minerals
+
+
+def _parse_json_array(text: str) -> Optional[List[Any]]:
+    """Parse the JSON array in a model response, ignoring surrounding text.
+
+    Args:
+        text: The model response.
+
+    Returns:
+        The parsed list, or None if the response holds no well-formed array.
+    """
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        data = orjson.loads(text[start : end + 1])
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, list) else None
 
-            # Preserve the original ID
-            corrected_result.id = previous_result.id
 
-            return corrected_result
-        except GeminiServiceException:
-            # Re-raise GeminiServiceExceptions
-            raise
-        except Exception as e:  # pragma: no cover
-            logger.error(f"Error in correct_analysis: {str(e)}")
-            error_message = f"Failed to correct food analysis: {str(e)}"
+def _is_food_name_list(value: Any) -> bool:
+    """Return whether an extraction result is a list of food name strings."""
+    return isinstance(value, list) and all(isinstance(name, str) for name in value)
 
-            # Return original result with error
-            previous_result.error = error_message
-            return previous_result
 
-    def _generate_food_text_analysis_prompt(self, description: str, context: str = "") -> str:
-        """Generate a prompt for food analysis.
+def _unique_food_names(food_names: List[Any]) -> List[str]:
+    """Drop blank and duplicate food names, comparing case-insensitively.
 
-        Args:
-            description: The food description.
+    Args:
+        food_names: Food names extracted by Gemini.
 
-        Returns:
-            The prompt.
-        """
-        return f"""
+    Returns:
+        The stripped names in their original order, each appearing once.
+    """
+    seen = set()
+    unique_names = []
+    for name in food_names:
+        name = str(name).strip()
+        key = name.lower()
+        if key and key not in seen:
+            seen.add(key)
+            unique_names.append(name)
+    return unique_names
+
+
+# Static prompts are built once at import time. The text analysis, nutrition
+# label and correction prompts are str.format templates, so literal braces
+# are doubled.
+_FOOD_TEXT_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
             You are a food recognition and nutrition analysis expert. Carefully analyze this food description: {description}{context}
             
             Please analyze the ingredients and nutritional content based on this description.
@@ -362,15 +280,15 @@ class FoodAnalysisService(BaseLangChainService):
             REMEMBER. If not described, assume a standard serving size and ingredients for 1 person only.
 
             Return your response as a strict JSON object with this exact format with NO COMMENTS:
-            {{{{
+            {{
                 "food_name": "string",
                 "ingredients": [
-                {{{{
+                {{
                     "name": "string",
                     "servings": number in kcal
-                }}}}
+                }}
                 ],
-                "nutrition_info": {{{{
+                "nutrition_info": {{
                 "calories": number in kcal,
                 "protein": number in grams,
                 "carbs": number in grams,
@@ -381,24 +299,24 @@ class FoodAnalysisService(BaseLangChainService):
                 "sugar": number in grams,
                 "cholesterol": number in mg,
                 "nutrition_density": number from calculation,
-                "vitamins_and_minerals": {{{{
+                "vitamins_and_minerals": {{
                     "vitamin_a": number,
                     "vitamin_c": number,
                     [other vitamins and minerals as detected] in miligrams
-                }}}}
-                }}}}
-            }}}}
+                }}
+                }}
+            }}
             ONLY return valid, parsable JSON. Do NOT include markdown ```json wrappers, comments, or extra explanations.
             Make sure the JSON is valid and parsable. Do not include any comments, annotations or notes in the JSON.
 
             IMPORTANT: Do not return a list. Return a single JSON object with the specified keys. Do not include any comments, annotations or notes in the JSON. Do not use '#' or '//' characters. Only return valid JSON.
             Make sure the ingredients's servings (kcal) adds up to the food kcal itself.
             If you cannot identify the food or analyze it properly, the food cant exist in real life or if the food is not edible use this format:
-            {{{{
+            {{
                 "error": "Description of the issue",
                 "food_name": "Unknown",
                 "ingredients": [],
-                "nutrition_info": {{{{
+                "nutrition_info": {{
                 "calories": 0,
                 "protein": 0,
                 "carbs": 0,
@@ -409,17 +327,12 @@ class FoodAnalysisService(BaseLangChainService):
                 "sugar": 0,
                 "cholesterol": 0,
                 "nutrition_density": 0,
-                "vitamins_and_minerals": {{{{}}}}
-                }}}}
-            }}}}"""
-
-    def _generate_food_image_analysis_prompt(self) -> str:
-        """Generate a prompt for food image analysis.
+                "vitamins_and_minerals": {{}}
+                }}
+            }}"""
+)
 
-        Returns:
-            The prompt.
-        """
-        return """
+_FOOD_IMAGE_PROMPT: Final[str] = """
             You are a food recognition and nutrition analysis expert. Carefully analyze this image and identify any food or meal present.
 
             Please look for:
@@ -478,16 +391,51 @@ class FoodAnalysisService(BaseLangChainService):
             If the image is not clearly food, indicate this in the food_name (Unknown) and set all nutritional values to 0.
             """
 
-    def _generate_nutrition_label_prompt(self, servings: float) -> str:
-        """Generate a prompt for nutrition label analysis.
+_FOOD_IMAGES_BATCH_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
+            You are a food recognition and nutrition analysis expert. You are given {count} images.
+            Analyze each image separately and identify any food or meal present.
 
-        Args:
-            servings: The number of servings.
+            For each image, provide:
+            - The specific name of the food
+            - A list of likely ingredients with estimated servings composition in calories
+            - Nutrition information: calories (kcal), protein (g), carbs (g), fat (g),
+              saturated fat (g), sodium (mg), fiber (g), sugar (g), cholesterol (mg),
+              a nutrition density score from 0-100, and important vitamins and minerals
 
-        Returns:
-            The prompt.
-        """
-        return f"""Analyze this nutrition label image and extract the nutritional information.
+            Return your response as a JSON array with exactly {count} objects, one per image,
+            in the same order as the images. Each object has the following structure:
+
+            {{
+              "food_name": "Descriptive name of the food",
+              "ingredients": [
+                {{"name": "Ingredient 1", "servings": 100}}
+              ],
+              "nutrition_info": {{
+                "calories": 0,
+                "protein": 0,
+                "carbs": 0,
+                "fat": 0,
+                "saturated_fat": 0,
+                "sodium": 0,
+                "fiber": 0,
+                "sugar": 0,
+                "cholesterol": 0,
+                "nutrition_density": 0,
+                "vitamins_and_minerals": {{
+                  "vitamin_a": 0,
+                  "vitamin_c": 0
+                }}
+              }}
+            }}
+            Make sure each food's ingredient servings (kcal) add up to the food kcal itself.
+
+            If an image is not clearly food, set its food_name to Unknown and all nutritional values to 0.
+            """
+)
+
+_NUTRITION_LABEL_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """Analyze this nutrition label image and extract the nutritional information.
             The user is consuming {servings} serving(s) of this food.
 
             Make sure calories is in kcal and extract all nutritional information you can find:
@@ -533,25 +481,42 @@ class FoodAnalysisService(BaseLangChainService):
             Adjust all nutritional values for {servings} serving(s).
             If the image is not clearly a nutrition label, indicate this in the food_name (Unknown) and set all nutritional values to 0.
             """
+)
 
-    def _generate_correction_prompt(
-        self, previous_result: Dict[str, Any], user_comment: str
-    ) -> str:
-        """Generate a prompt for correction.
+_FOOD_NAMES_BATCH_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
+    You are an expert in Indonesian food recognition.
 
-        Args:
-            previous_result: The previous food analysis result as a dictionary.
-            user_comment: The user's feedback.
+    For each numbered user input below, extract a list of clearly named food or drink items mentioned.
+    Respond with only a valid JSON array containing one list per input, in the same order. Do not include any other text.
 
-        Returns:
-            The prompt.
-        """
-        # Convert the previous result to a formatted JSON string
-        previous_result_json = json.dumps(previous_result, indent=2)
+    Inputs:
+{inputs}
 
-        return f"""I previously analyzed a food item and provided the following nutritional information:
+    Output format:
+    [["food name 1", "food name 2"], ["food name 3"]]
+    """
+)
 
-            {previous_result_json}
+_FOOD_NAMES_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """
+    You are an expert in Indonesian food recognition.
+
+    From the following user input, extract a list of clearly named food or drink items mentioned.
+    Respond with only a valid JSON list. Do not include any other text.
+
+    Input:
+    {description}
+
+    Output format:
+    ["food name 1", "food name 2", "..."]
+    """
+)
+
+_FOOD_CORRECTION_PROMPT: Final[PreparedPrompt] = PreparedPrompt(
+    """I previously analyzed a food item and provided the following nutritional information:
+
+            {previous_result_json}
 
             The user has provided this feedback to correct or improve the analysis:
             "{user_comment}"
@@ -599,11 +564,201 @@ class FoodAnalysisService(BaseLangChainService):
             If correction doesnt make sense, return previous json result with the error message in error attribute in json and unknown food name.
             NOTHING ELSE IS ALLOWED, ONLY VALID JSON RESPONSE. EXPLANATION OF CHANGES IS NOT NEEDED!
             """
+)
 
-    def _parse_food_analysis_response(
+
+class FoodAnalysisService(BaseLangChainService):
+    """Food analysis service using Gemini API."""
+
+    # Constants for thresholds (kept for documentation purposes)
+    HIGH_SODIUM_THRESHOLD = 500  # mg
+    HIGH_SUGAR_THRESHOLD = 20.0  # g
+    HIGH_CHOLESTEROL_THRESHOLD = 200.0  # mg
+    HIGH_SATURATED_FAT_THRESHOLD = 5.0  # g
+
+    def __init__(
+        self,
+        text_llm: Optional[BaseChatModel] = None,
+        multimodal_llm: Optional[BaseChatModel] = None,
+    ):
+        super().__init__(text_llm=text_llm, multimodal_llm=multimodal_llm)
+        self.supabase_url = os.environ.get("SUPABASE_URL")
+        self.supabase_key = os.environ.get("SUPABASE_KEY")
+        # A client to use instead of the shared ones. The shared async clients
+        # can only be created inside a coroutine, see _get_supabase_client.
+        self.supabase_client: Optional["AsyncClient"] = None
+        if not self.supabase_url or not self.supabase_key:
+            logger.warning("Supabase URL or Key not found in environment variables. RAG will be disabled.")
+        # Concurrent food-name extractions share one Gemini call, with at most
+        # a few calls in flight so bursts collapse into fuller batches
+        self._food_name_batcher: BatchingInvoker[str, List[str]] = BatchingInvoker(
+            self._extract_food_names_batch, max_concurrent_batches=4
+        )
+
+    async def aclose(self) -> None:
+        """Close the models and this event loop's shared Supabase clients."""
+        await super().aclose()
+        clients = _SUPABASE_CLIENTS.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            try:
+                await client.postgrest.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close Supabase client: {str(e)}")
+
+    async def _get_supabase_client(self) -> Optional["AsyncClient"]:
+        """Get the async Supabase client, creating it on first use.
+
+        The client is shared by every service on the current event loop
+        configured with the same credentials, so its HTTP connection pool is
+        reused across requests.
+
+        Returns:
+            The Supabase client, or None if Supabase is not configured.
+        """
+        if self.supabase_client is not None:
+            return self.supabase_client
+        if not self.supabase_url or not self.supabase_key:
+            return None
+
+        loop = asyncio.get_running_loop()
+        clients = _SUPABASE_CLIENTS.setdefault(loop, {})
+        credentials = (self.supabase_url, self.supabase_key)
+        if credentials not in clients:
+            # Imported here so deployments without Supabase never load it
+            from supabase import create_async_client
+
+            async with _SUPABASE_CLIENT_LOCKS.setdefault(loop, asyncio.Lock()):
+                if credentials not in clients:
+                    clients[credentials] = await create_async_client(*credentials)
+        return clients[credentials]
+
+    async def _fetch_nutrition_entry(
+        self, supabase_client: "AsyncClient", food_name: str
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch the best matching nutrition_data row for a food name.
+
+        Args:
+            supabase_client: The Supabase client.
+            food_name: The food name to look up.
+
+        Returns:
+            The matching row, or None if there is no match.
+        """
+        # maybe_single() unwraps the single row and returns None when nothing matches
+        response = await supabase_client.table("nutrition_data") \
+            .select(_DB_SELECT_COLUMNS) \
+            .ilike("food", f"%{food_name}%") \
+            .limit(1) \
+            .maybe_single() \
+            .execute()
+        return response.data if response else None
+
+    async def _retrieve_relevant_food_data(self, query: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Retrieve relevant food records from Supabase and generate context for RAG."""
+        try:
+            # Client creation can fail too (bad URL, network); RAG is then skipped
+            supabase_client = await self._get_supabase_client()
+            if not supabase_client:
+                logger.warning("Supabase client not initialized, skipping RAG retrieval.")
+                return [], ""
+
+            # Step 1: Ekstrak nama makanan dari input user pakai Gemini
+            extracted_food = await self._extract_food_names_with_gemini(query)
+            if not extracted_food:
+                return [], ""
+
+            # Step 2: Ambil data nutrisi dari Supabase, semua nama makanan secara paralel
+            entries = await asyncio.gather(
+                *(
+                    self._fetch_nutrition_entry(supabase_client, name)
+                    for name in _unique_food_names(extracted_food)
+                )
+            )
+
+            cleaned_data = []
+            context = io.StringIO()
+            context.write("\n\nRelevant Nutrition Facts From Local DB:\n")
+
+            for entry in entries:
+                if entry:
+                    # Build cleaned data
+                    nutrition_info: Dict[str, Any] = {
+                        field: entry.get(column, 0.0)
+                        for field, column in _DB_NUTRITION_COLUMNS.items()
+                    }
+                    nutrition_info["vitamins_and_minerals"] = {
+                        column: entry.get(column, 0.0) for column in _DB_VITAMIN_COLUMNS
+                    }
+
+                    cleaned_data.append({
+                        "food_name": entry["food"],
+                        "nutrition_info": nutrition_info
+                    })
+
+                    # Add to RAG context, separating foods with a blank line
+                    context.write(f"\n- Food: {entry['food']}\n")
+                    for k, v in nutrition_info.items():
+                        if k == "vitamins_and_minerals":
+                            context.write("  Vitamins and minerals:\n")
+                            for vk, vv in v.items():
+                                context.write(f"    - {vk}: {vv}\n")
+                        else:
+                            context.write(f"  {k.replace('_', ' ').capitalize()}: {v}\n")
+
+            return cleaned_data, context.getvalue()
+
+        except Exception as e:
+            logger.error(f"Failed to retrieve relevant food data: {str(e)}")
+            return [], ""
+
+
+    async def analyze_by_text(self, description: str) -> FoodAnalysisResult:
+        """Analyze food from a text description, using RAG if relevant data exists.
+
+        Args:
+            description: The food description.
+
+        Returns:
+            The food analysis result.
+        """
+
+        # Step 1: Build the prompt, with Supabase context when available
+        formatted_prompt = await self.build_text_analysis_prompt(description)
+        try:
+            # Step 2: Call Gemini model
+            response_text = await self._invoke_text_model(formatted_prompt)
+
+            # Step 3: Parse result off the event loop
+            return await self.parse_analysis_response(response_text, description)
+        except GeminiServiceException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in analyze_by_text with RAG: {str(e)}")
+            return FoodAnalysisResult(
+                food_name="Unknown",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=f"Failed to analyze food text: {str(e)}"
+            )
+
+    async def build_text_analysis_prompt(self, description: str) -> str:
+        """Build the text analysis prompt, including RAG context when relevant data exists.
+
+        Args:
+            description: The food description.
+
+        Returns:
+            The prompt to send to the text model.
+        """
+        _, context = await self._retrieve_relevant_food_data(description)
+        return self._generate_food_text_analysis_prompt(
+            description=description, context=context
+        )
+
+    async def parse_analysis_response(
         self, response_text: str, default_food_name: str
     ) -> FoodAnalysisResult:
-        """Parse the response from the Gemini API for food analysis.
+        """Parse a food analysis response off the event loop.
 
         Args:
             response_text: The response text from the Gemini API.
@@ -612,60 +767,343 @@ class FoodAnalysisService(BaseLangChainService):
         Returns:
             The food analysis result.
         """
+        return await asyncio.to_thread(
+            self._parse_food_analysis_response, response_text, default_food_name
+        )
+
+    async def analyze_by_image(self, image_file) -> FoodAnalysisResult:
+        """Analyze food from an image.
+
+        Args:
+            image_file: The image file (file-like object).
+
+        Returns:
+            The food analysis result.
+
+        Raises:
+            GeminiServiceException: If the analysis fails.
+        """
+        if not image_file:
+            error_message = "No image file provided"
+            logger.error(error_message)
+            return FoodAnalysisResult(
+                food_name="Unknown",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=error_message,
+            )
+
         try:
-            # Remove markdown code block if present
-            response_text = response_text.strip()
+            # Read the upload off the event loop; large uploads are spooled to
+            # disk, so the read can block
+            image = await asyncio.to_thread(self._read_image_bytes, image_file)
+            return await self._analyze_image(image)
+        except InvalidImageError as e:
+            # Handle image processing errors
+            logger.error(f"Invalid image error: {str(e)}")
+            return FoodAnalysisResult(
+                food_name="Unknown",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=str(e),
+            )
+        except Exception as e:  # pragma: no cover
+            logger.error(f"Error in analyze_by_image: {str(e)}")
+            error_message = f"Failed to analyze food image: {str(e)}"
 
-            # Decode if it's in bytes and sanitize
-            if isinstance(response_text, bytes):
-                response_text = response_text.decode("utf-8", errors="replace")
+            # Return result with error
+            return FoodAnalysisResult(
+                food_name="Unknown",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=error_message,
+            )
 
-            # Replace known weird artifacts
-            response_text = response_text.replace('\ufeff', '')  # BOM
-            response_text = response_text.replace('<?xml version="1.0" encoding="UTF-8"?>', '')  # common header
+    async def analyze_by_images(self, image_files: List[Any]) -> List[FoodAnalysisResult]:
+        """Analyze several food images with a single Gemini request.
 
+        All readable images are sent in one multimodal message and the model
+        returns one analysis per image. If the reply does not hold exactly one
+        object per image, each image is analyzed on its own instead.
 
-            # Remove any markdown code fence regardless of language
-            if response_text.startswith("```"):
-                response_text = response_text.split("```", 1)[-1].strip()
-            if response_text.endswith("```"):
-                response_text = response_text.rsplit("```", 1)[0].strip()
+        Args:
+            image_files: The image files (file-like objects), in order.
 
-            # Also remove weird XML-like headers
-            if response_text.startswith("<?"):
-                response_text = response_text.split("?>", 1)[-1].strip()
-            
-            # If it starts with 'json\n{', strip that broken markdown hint
-            if response_text.lower().startswith("json\n"):
-                response_text = response_text[5:].lstrip()
-
-            # Extract JSON from the response
-            json_str = extract_json_from_text(response_text)
-            if not json_str:
-                logger.warning("No JSON found in response, returning raw response")
-                return self._create_error_result(
-                    default_food_name,
-                    f"Failed to parse response: {response_text[:100]}...",
+        Returns:
+            One food analysis result per image, in the same order.
+        """
+        images = await asyncio.gather(
+            *(asyncio.to_thread(self._read_image_bytes, image_file) for image_file in image_files),
+            return_exceptions=True,
+        )
+        readable = [image for image in images if isinstance(image, bytes)]
+
+        analyses: Optional[List[Any]] = None
+        if len(readable) > 1:
+            analyses = await self._analyze_images_together(readable)
+        if analyses is None:
+            analyses = await asyncio.gather(
+                *(self._analyze_image(image) for image in readable),
+                return_exceptions=True,
+            )
+
+        results = []
+        pending = iter(analyses)
+        for image in images:
+            outcome = next(pending) if isinstance(image, bytes) else image
+            if isinstance(outcome, InvalidImageError):
+                results.append(self._create_error_result("Unknown", str(outcome)))
+            elif isinstance(outcome, BaseException):
+                logger.error(f"Error in analyze_by_images: {str(outcome)}")
+                results.append(
+                    self._create_error_result(
+                        "Unknown", f"Failed to analyze food image: {str(outcome)}"
+                    )
                 )
+            else:
+                results.append(outcome)
+        return results
+
+    async def _analyze_images_together(
+        self, images: List[bytes]
+    ) -> Optional[List[FoodAnalysisResult]]:
+        """Analyze several images in one request.
+
+        Args:
+            images: The raw image bytes.
+
+        Returns:
+            One result per image, or None if the request failed or the reply
+            did not match the images.
+        """
+        try:
+            response_text = await self._invoke_multimodal_model_with_images(
+                _FOOD_IMAGES_BATCH_PROMPT.format(count=len(images)), images
+            )
+            items = await asyncio.to_thread(_parse_json_array, response_text)
+        except Exception as e:
+            logger.warning(f"Batched image analysis failed: {str(e)}")
+            return None
+
+        if items is None or len(items) != len(images):
+            logger.warning("Batched image response did not match the images")
+            return None
+        return [
+            self._build_food_analysis_result(item, "image")
+            if isinstance(item, dict)
+            else self._create_error_result("Unknown", "Failed to parse response for image")
+            for item in items
+        ]
+
+    async def _analyze_image(self, image: bytes) -> FoodAnalysisResult:
+        """Analyze one food image.
+
+        Args:
+            image: The raw image bytes.
+
+        Returns:
+            The food analysis result.
+        """
+        # Generate the prompt for food image analysis
+        prompt = self._generate_food_image_analysis_prompt()
+
+        # Invoke the multimodal model
+        response_text = await self._invoke_multimodal_model(prompt, image)
+
+        # Parse the response off the event loop
+        return await asyncio.to_thread(
+            self._parse_food_analysis_response, response_text, "image"
+        )
+
+    async def analyze_nutrition_label(
+        self, image_file, servings: float = 1.0
+    ) -> FoodAnalysisResult:
+        """Analyze a nutrition label image.
+
+        Args:
+            image_file: The image file (file-like object).
+            servings: The number of servings.
+
+        Returns:
+            The food analysis result.
+
+        Raises:
+            GeminiServiceException: If the analysis fails.
+        """
+        if not image_file:  # pragma: no cover
+            error_message = "No image file provided"
+            logger.error(error_message)
+            return FoodAnalysisResult(
+                food_name="Nutrition Label",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=error_message,
+            )   
+        try:
+            # Read the upload off the event loop; large uploads are spooled to
+            # disk, so the read can block
+            image = await asyncio.to_thread(self._read_image_bytes, image_file)
 
-            # Parse the JSON
-            data = parse_json_safely(json_str)
+            # Generate the prompt for nutrition label analysis
+            prompt = self._generate_nutrition_label_prompt(servings)
 
-            # Extract ingredients
-            ingredients = self._extract_ingredients(data)
+            # Invoke the multimodal model
+            response_text = await self._invoke_multimodal_model(prompt, image)
 
-            # Extract nutrition info
-            nutrition_info = self._extract_nutrition_info(data)
+            # Parse the response off the event loop
+            return await asyncio.to_thread(
+                self._parse_food_analysis_response, response_text, "Nutrition Label"
+            )
+        except InvalidImageError as e:
+            # Handle image processing errors
+            logger.error(f"Invalid image error: {str(e)}")  # pragma: no cover
+            return FoodAnalysisResult(  # pragma: no cover
+                food_name="Nutrition Label",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=str(e),
+            )
+        except Exception as e:  # pragma: no cover
+            logger.error(f"Error in analyze_nutrition_label: {str(e)}")
+            error_message = f"Failed to analyze nutrition label: {str(e)}"
 
-            # Create and return the result
-            result = FoodAnalysisResult(
-                food_name=data.get("food_name", default_food_name),  # pragma: no cover
-                ingredients=ingredients,
-                nutrition_info=nutrition_info,
-                error=data.get("error"),
+            # Return result with error
+            return FoodAnalysisResult(
+                food_name="Nutrition Label",
+                ingredients=[],
+                nutrition_info=_EMPTY_NUTRITION_INFO,
+                error=error_message,
             )
 
-            return result
+    async def correct_analysis(
+        self, previous_result: FoodAnalysisResult, user_comment: str
+    ) -> FoodAnalysisResult:
+        """Correct a previous food analysis based on user feedback.
+
+        Args:
+            previous_result: The previous food analysis result.
+            user_comment: The user's feedback.
+
+        Returns:
+            The corrected food analysis result.
+
+        Raises:
+            GeminiServiceException: If the correction fails.
+        """
+
+        # Serialize the previous result straight to JSON for the prompt
+        previous_result_json = previous_result.model_dump_json(exclude={"timestamp", "id"})
+
+        # Generate the prompt for correction
+        prompt = self._generate_correction_prompt(previous_result_json, user_comment)
+
+        try:
+            # Invoke the model
+            response_text = await self._invoke_text_model(prompt)
+
+            # Parse the response off the event loop
+            corrected_result = await asyncio.to_thread(
+                self._parse_food_analysis_response, response_text, previous_result.food_name
+            )
+
+            # Preserve the original ID
+            corrected_result.id = previous_result.id
+
+            return corrected_result
+        except GeminiServiceException:
+            # Re-raise GeminiServiceExceptions
+            raise
+        except Exception as e:  # pragma: no cover
+            logger.error(f"Error in correct_analysis: {str(e)}")
+            error_message = f"Failed to correct food analysis: {str(e)}"
+
+            # Return original result with error
+            previous_result.error = error_message
+            return previous_result
+
+    def _generate_food_text_analysis_prompt(self, description: str, context: str = "") -> str:
+        """Generate a prompt for food analysis.
+
+        Args:
+            description: The food description.
+
+        Returns:
+            The prompt.
+        """
+        return _FOOD_TEXT_PROMPT.format(description=description, context=context)
+
+    def _generate_food_image_analysis_prompt(self) -> str:
+        """Generate a prompt for food image analysis.
+
+        Returns:
+            The prompt.
+        """
+        return _FOOD_IMAGE_PROMPT
+
+    def _generate_nutrition_label_prompt(self, servings: float) -> str:
+        """Generate a prompt for nutrition label analysis.
+
+        Args:
+            servings: The number of servings.
+
+        Returns:
+            The prompt.
+        """
+        return _NUTRITION_LABEL_PROMPT.format(servings=servings)
+
+    def _generate_correction_prompt(
+        self, previous_result_json: str, user_comment: str
+    ) -> str:
+        """Generate a prompt for correction.
+
+        Args:
+            previous_result_json: The previous food analysis result serialized as JSON.
+            user_comment: The user's feedback.
+
+        Returns:
+            The prompt.
+        """
+        return _FOOD_CORRECTION_PROMPT.format(
+            previous_result_json=previous_result_json, user_comment=user_comment
+        )
+
+    def _parse_food_analysis_response(
+        self, response_text: str, default_food_name: str
+    ) -> FoodAnalysisResult:
+        """Parse the response from the Gemini API for food analysis.
+
+        Args:
+            response_text: The response text from the Gemini API.
+            default_food_name: Default food name to use if parsing fails.
+
+        Returns:
+            The food analysis result.
+        """
+        try:
+            # Decode if it's in bytes
+            if isinstance(response_text, bytes):
+                response_text = response_text.decode("utf-8", errors="replace")
+
+            # Strip BOMs, XML headers, markdown fences and stray 'json' hints in one pass
+            response_text = _RESPONSE_NOISE_RE.sub("", response_text)
+
+            # Well-formed responses, even with surrounding text, skip
+            # extraction and repair entirely
+            data = try_parse_embedded_json(response_text)
+            if data is None:
+                # Extract JSON from the response
+                json_str = extract_json_from_text(response_text)
+                if not json_str:
+                    logger.warning("No JSON found in response, returning raw response")
+                    return self._create_error_result(
+                        default_food_name,
+                        f"Failed to parse response: {response_text[:100]}...",
+                    )
+
+                # Parse the JSON
+                data = parse_json_safely(json_str)
+
+            return self._build_food_analysis_result(data, default_food_name)
 
         except Exception as e:
             logger.error(
@@ -675,10 +1113,29 @@ class FoodAnalysisService(BaseLangChainService):
             return FoodAnalysisResult(  # pragma: no cover
                 food_name=default_food_name,
                 ingredients=[],
-                nutrition_info=NutritionInfo(),
+                nutrition_info=_EMPTY_NUTRITION_INFO,
                 error=f"Failed to parse response: {str(e)}",
             )
 
+    def _build_food_analysis_result(
+        self, data: Dict[str, Any], default_food_name: str
+    ) -> FoodAnalysisResult:
+        """Build a food analysis result from a parsed response object.
+
+        Args:
+            data: The parsed JSON data.
+            default_food_name: Default food name to use if the data has none.
+
+        Returns:
+            The food analysis result.
+        """
+        return FoodAnalysisResult(
+            food_name=data.get("food_name", default_food_name),  # pragma: no cover
+            ingredients=self._extract_ingredients(data),
+            nutrition_info=self._extract_nutrition_info(data),
+            error=data.get("error"),
+        )
+
     # Remove the _generate_warnings method as warnings are handled in the Flutter model
 
     def _extract_ingredients(self, data: Dict[str, Any]) -> List[Ingredient]:
@@ -708,34 +1165,23 @@ class FoodAnalysisService(BaseLangChainService):
         Returns:
             Nutrition info object.
         """
-        nutrition_info = NutritionInfo()
-        if "nutrition_info" in data and isinstance(data["nutrition_info"], dict):
-            nutrition_data = data["nutrition_info"]
-            
-            # Extract vitamins and minerals if present
-            vitamins_and_minerals = {}
-            if "vitamins_and_minerals" in nutrition_data and isinstance(nutrition_data["vitamins_and_minerals"], dict):
-                for key, value in nutrition_data["vitamins_and_minerals"].items():
-                    try:
-                        vitamins_and_minerals[key] = float(value)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Could not convert {key} value to float: {value}")
-            
-            # Create nutrition info object with all fields
-            nutrition_info = NutritionInfo(
-                calories=float(nutrition_data.get("calories", 0)),
-                protein=float(nutrition_data.get("protein", 0)),
-                carbs=float(nutrition_data.get("carbs", 0)),
-                fat=float(nutrition_data.get("fat", 0)),
-                saturated_fat=float(nutrition_data.get("saturated_fat", 0)),
-                sodium=float(nutrition_data.get("sodium", 0)),
-                fiber=float(nutrition_data.get("fiber", 0)),
-                sugar=float(nutrition_data.get("sugar", 0)),
-                cholesterol=float(nutrition_data.get("cholesterol", 0)),
-                nutrition_density=float(nutrition_data.get("nutrition_density", 0)),
-                vitamins_and_minerals=vitamins_and_minerals
-            )
-        return nutrition_info
+        nutrition_data = data.get("nutrition_info")
+        if not isinstance(nutrition_data, dict):
+            return _EMPTY_NUTRITION_INFO
+
+        # Start from 0.0 defaults and convert only the fields Gemini returned
+        fields = _NUTRITION_DEFAULTS.copy()
+        fields.update(
+            (name, _to_float(value))
+            for name, value in nutrition_data.items()
+            if name in _NUTRITION_DEFAULTS
+        )
+        return NutritionInfo(
+            **fields,
+            vitamins_and_minerals=_coerce_vitamins_and_minerals(
+                nutrition_data.get("vitamins_and_minerals")
+            ),
+        )
 
     def _create_error_result(
         self, food_name: str, error_message: str
@@ -752,27 +1198,87 @@ class FoodAnalysisService(BaseLangChainService):
         return FoodAnalysisResult(
             food_name=food_name,
             ingredients=[],
-            nutrition_info=NutritionInfo(),
+            nutrition_info=_EMPTY_NUTRITION_INFO,
             error=error_message,
         )
     
     async def _extract_food_names_with_gemini(self, description: str) -> List[str]:
-        """Use Gemini to extract food names from a long user description."""
-        prompt = f"""
-    You are an expert in Indonesian food recognition.
-
-    From the following user input, extract a list of clearly named food or drink items mentioned.
-    Respond with only a valid JSON list. Do not include any other text.
+        """Use Gemini to extract food names from a long user description.
 
-    Input:
-    "{description}"
+        Successful extractions are cached, so repeated descriptions skip the LLM call.
+        On an exact miss, descriptions with the same content words are reused.
+        Cache misses arriving concurrently are batched into a single Gemini call.
+        """
+        description = normalize_text(description)
+        cache_key = ResponseCache.make_key(description)
+        similarity_key = _food_name_similarity_key(description)
+        cached = _get_cached_food_names(cache_key)
+        if cached is None and similarity_key is not None:
+            cached = _get_cached_food_names(similarity_key)
+        if cached is not None:
+            return cached
 
-    Output format:
-    ["food name 1", "food name 2", "..."]
-    """
         try:
-            response = await self._invoke_text_model(prompt)
-            return json.loads(response)
+            food_names = await self._food_name_batcher.submit(description)
         except Exception as e:
             logger.error(f"Failed to extract food names: {e}")
             return []
+
+        if not _is_food_name_list(food_names):
+            logger.warning("Food-name extraction returned an unexpected shape")
+            return []
+
+        _cache_food_names(cache_key, food_names)
+        if similarity_key is not None:
+            _cache_food_names(similarity_key, food_names)
+        return food_names
+
+    async def _extract_food_names_batch(self, descriptions: List[str]) -> List[Any]:
+        """Extract food names for several descriptions with one Gemini call.
+
+        Args:
+            descriptions: The user descriptions, in submission order.
+
+        Returns:
+            One food-name list (or the exception raised for it) per description.
+        """
+        results: List[Any] = [None] * len(descriptions)
+        retry = list(range(len(descriptions)))
+        if len(descriptions) > 1:
+            inputs = "\n".join(
+                f"    {i}. {json.dumps(description, ensure_ascii=False)}"
+                for i, description in enumerate(descriptions, 1)
+            )
+            try:
+                response = await self._invoke_text_model(
+                    _FOOD_NAMES_BATCH_PROMPT.format(inputs=inputs)
+                )
+                batch = orjson.loads(response)
+                if isinstance(batch, list) and len(batch) == len(descriptions):
+                    results = batch
+                    retry = [i for i, names in enumerate(batch) if not _is_food_name_list(names)]
+                    if retry:
+                        logger.warning(f"{len(retry)} batched food-name results were malformed")
+                else:
+                    logger.warning("Batched food-name response did not match the inputs")
+            except Exception as e:
+                logger.warning(f"Batched food-name extraction failed: {e}")
+
+        # Single descriptions, a failed batch, or malformed entries in it are
+        # extracted one by one
+        if retry:
+            retried = await asyncio.gather(
+                *(self._request_food_names(descriptions[i]) for i in retry),
+                return_exceptions=True,
+            )
+            for i, food_names in zip(retry, retried):
+                results[i] = food_names
+        return results
+
+    async def _request_food_names(self, description: str) -> Any:
+        """Ask Gemini for the food names in a single description."""
+        prompt = _FOOD_NAMES_PROMPT.format(
+            description=json.dumps(description, ensure_ascii=False)
+        )
+        response = await self._invoke_text_model(prompt)
+        return orjson.loads(response)
@@ -0,0 +1,161 @@
+"""
+Request batching utilities for Gemini API services.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchingInvoker(Generic[T, R]):
+    """Coalesce concurrent calls into batched calls.
+
+    Items submitted within ``max_wait`` seconds of each other (up to
+    ``max_batch_size``) are passed together to ``batch_fn``, which must return
+    one result per item in the same order. A result that is an exception is
+    raised to the caller that submitted that item; if ``batch_fn`` itself
+    raises, every caller in the batch receives the error.
+
+    With ``max_concurrent_batches`` set, items ready while that many batches
+    are running stay queued and are sent once one finishes, so under load the
+    invoker makes fewer, fuller calls instead of an unbounded number of them.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Awaitable[List[Any]]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.025,
+        max_concurrent_batches: Optional[int] = None,
+    ) -> None:
+        """Initialize the invoker.
+
+        Args:
+            batch_fn: Coroutine function processing a list of items.
+            max_batch_size: Maximum number of items per batch.
+            max_wait: Seconds to wait for more items before flushing a batch.
+            max_concurrent_batches: Maximum number of batches running at
+                once, or None for no limit.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+        self._running = 0
+        self._pending: List[Tuple[T, "asyncio.Future[R]"]] = []
+        self._flush_task: Optional["asyncio.Task[None]"] = None
+        self._batch_tasks: Set["asyncio.Task[None]"] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, item: T) -> R:
+        """Queue an item for the next batch and wait for its result.
+
+        Args:
+            item: The item to process.
+
+        Returns:
+            The result ``batch_fn`` produced for the item.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # State left over from a previous event loop can never be flushed
+            self._pending = []
+            self._flush_task = None
+            self._running = 0
+            self._loop = loop
+
+        future: "asyncio.Future[R]" = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._start_batch()
+        elif self._flush_task is None:
+            self._flush_task = self._create_task(self._flush_after_wait())
+
+        return await future
+
+    async def _flush_after_wait(self) -> None:
+        """Flush the pending items once the batching window has elapsed."""
+        await asyncio.sleep(self.max_wait)
+        self._flush_task = None
+        if self._pending:
+            self._start_batch()
+
+    def _start_batch(self) -> None:
+        """Flush pending items now, cancelling the window timer.
+
+        At the concurrency limit the items stay queued until a running batch
+        finishes.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._at_limit():
+            return
+        self._running += 1
+        self._create_task(self._run_batch(self._take_pending()))
+
+    def _at_limit(self) -> bool:
+        """Return whether the maximum number of batches is already running."""
+        return (
+            self.max_concurrent_batches is not None
+            and self._running >= self.max_concurrent_batches
+        )
+
+    def _create_task(self, coro: Awaitable[None]) -> "asyncio.Task[None]":
+        """Start a task, keeping a reference until it finishes."""
+        task = asyncio.ensure_future(coro)
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+        return task
+
+    def _take_pending(self) -> List[Tuple[T, "asyncio.Future[R]"]]:
+        """Detach and return up to ``max_batch_size`` pending items."""
+        batch = self._pending[: self.max_batch_size]
+        del self._pending[: self.max_batch_size]
+        return batch
+
+    async def _run_batch(self, batch: List[Tuple[T, "asyncio.Future[R]"]]) -> None:
+        """Process a batch, then send any items queued behind the limit."""
+        try:
+            await self._process_batch(batch)
+        finally:
+            self._running -= 1
+            # Items with a running window timer are flushed by that timer
+            while self._pending and self._flush_task is None and not self._at_limit():
+                self._start_batch()
+
+    async def _process_batch(self, batch: List[Tuple[T, "asyncio.Future[R]"]]) -> None:
+        """Run ``batch_fn`` on a batch and resolve each submitter's future."""
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Batch returned {len(results)} results for {len(batch)} items"
+                )
+        except Exception as e:
+            logger.error(f"Batched call failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled (e.g. at shutdown): release the submitters instead of
+            # leaving them waiting on futures nothing will resolve
+            for _, future in batch:
+                future.cancel()
+            raise
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
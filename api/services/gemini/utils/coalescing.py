@@ -0,0 +1,64 @@
+"""
+In-flight request coalescing for Gemini API services.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class RequestCoalescer(Generic[R]):
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same task instead of starting their own. Once the
+    call finishes the key is forgotten, so only concurrent duplicates are
+    merged. A caller being cancelled does not cancel the shared call.
+    """
+
+    def __init__(self, copy_result: Optional[Callable[[R], R]] = None) -> None:
+        """Initialize the coalescer.
+
+        Args:
+            copy_result: Applied to the shared result for every caller except
+                the one that started the call, so callers can get their own
+                copy of a mutable result.
+        """
+        self.copy_result = copy_result
+        self._inflight: Dict[str, "asyncio.Task[R]"] = {}
+
+    async def run(self, key: str, call: Callable[[], Awaitable[R]]) -> R:
+        """Run ``call`` for ``key``, or join the call already running for it.
+
+        Args:
+            key: Identifies calls whose results are interchangeable.
+            call: Zero-argument coroutine function performing the call.
+
+        Returns:
+            The call's result.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is loop:
+            logger.debug("Joining in-flight request")
+            result = await asyncio.shield(task)
+            return self.copy_result(result) if self.copy_result else result
+
+        task = asyncio.ensure_future(call())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[R]") -> None:
+        """Drop a finished task, unless a newer one has replaced it."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        """Return the number of calls currently in flight."""
+        return len(self._inflight)
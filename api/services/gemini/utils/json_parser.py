@@ -2,16 +2,173 @@
 JSON parsing utilities for Gemini API responses.
 """
 
-import json
 import re
 import logging
-from typing import Dict, Any, Optional, cast
+from functools import lru_cache
+from typing import Callable, Dict, Any, Optional, Tuple, cast
+
+import orjson
 
 from api.services.gemini.exceptions import GeminiParsingError
 
+__all__ = [
+    "JsonCompletionScanner",
+    "extract_json_from_text",
+    "try_parse_json_fast",
+    "try_parse_embedded_json",
+    "parse_json_safely",
+    "fix_common_json_errors",
+    "extract_fields",
+]
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Patterns used on every response, compiled once at import
+_RE_SINGLE_KEY = re.compile(r"'([^']*)':")
+_RE_SINGLE_VAL = re.compile(r":\s*'([^']*)'")
+_RE_ESCAPED_OR_REPEATED_QUOTES = re.compile(r'\\"|"{2,}')
+_RE_BRACKET = re.compile(r"[{}\[\]]")
+# Tokens _fix_commas rewrites: a string (with the gap to a following string or
+# object), a trailing comma, adjacent objects, and runs of colons. Strings are
+# matched whole so the other alternatives never fire inside them.
+_RE_COMMA_TOKEN = re.compile(
+    r'"(?:[^"\\]|\\.)*(")?(\s*(?=["{]))?|,\s*(?=[}\]])|\}\s*(?=\{)|:{2,}',
+    re.DOTALL,
+)
+
+# Typographic quotes mapped to their ASCII equivalents
+_SMART_QUOTE_TABLE = str.maketrans(
+    {"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"}
+)
+
+# Sentinel for missing keys in extract_fields
+_MISSING = object()
+
+
+class JsonCompletionScanner:
+    """Incrementally detect when the first top-level JSON value in a stream is complete.
+
+    Text is fed chunk by chunk as it arrives from a streaming model response.
+    Brackets inside JSON strings are ignored, so the scanner reports completion
+    exactly when the first ``{`` or ``[`` is balanced.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the scanner state."""
+        self.depth = 0
+        self.started = False
+        self.complete = False
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next chunk of text.
+
+        Args:
+            chunk: The next piece of the streamed response.
+
+        Returns:
+            True once the first top-level JSON value has been closed.
+        """
+        if self.complete:
+            return True
+
+        for char in chunk:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char in "{[":
+                self.started = True
+                self.depth += 1
+            elif not self.started:
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    return True
+
+        return False
+
+
+def _scan_json_span(text: str, opener: str) -> Optional[str]:
+    """Find the first JSON value starting with ``opener`` in a single pass.
+
+    Brackets are balanced while skipping over string contents, so the scan is
+    linear in the input and cannot backtrack. If the value is never closed
+    (e.g. a truncated response), everything from the opener onwards is
+    returned, minus trailing whitespace, so the bracket fixer can complete it.
+
+    Args:
+        text: The text to scan.
+        opener: Either ``{`` or ``[``.
+
+    Returns:
+        The JSON span, or None if ``opener`` does not occur in the text.
+    """
+    start = text.find(opener)
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    prev_backslash = False
+    for i, char in enumerate(text[start:], start):
+        if in_string:
+            if prev_backslash:
+                prev_backslash = False
+            elif char == "\\":
+                prev_backslash = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+
+    return text[start:].rstrip()
+
+
+def _find_json_code_block(text: str) -> Optional[str]:
+    """Find the first markdown code block whose content is a JSON object.
+
+    Fences are located with ``str.find``, so an unterminated block costs a
+    single linear scan instead of regex backtracking.
+
+    Args:
+        text: The text to search.
+
+    Returns:
+        The object inside the first matching block, or None if there is none.
+    """
+    start = text.find("```")
+    while start != -1:
+        end = text.find("```", start + 3)
+        if end == -1:
+            return None
+
+        block = text[start + 3 : end]
+        if block.startswith("json"):
+            block = block[4:]
+        block = block.strip()
+        if block.startswith("{") and block.endswith("}"):
+            return block
+
+        # The closing fence may open the next block
+        start = end
+    return None
+
 
 def extract_json_from_text(text: str) -> Optional[str]:
     """Extract JSON from text response.
@@ -26,51 +183,73 @@ def extract_json_from_text(text: str) -> Optional[str]:
         The extracted JSON string, or None if no JSON was found.
     """
 
+    # Both lookups return spans that start at the opening bracket and end at
+    # the closing one (or the trimmed end of the text), so no cleanup is needed.
+
     # Try to extract JSON from markdown code blocks
-    # Using a more efficient regex with atomic groups to prevent catastrophic backtracking
-    json_block_pattern = r"```(?:json)?\s*(\{[\s\S]*?\})\s*```"
-    matches = re.findall(json_block_pattern, text)
-
-    def clean(json_str: str) -> str:
-        return json_str.strip().lstrip("?>").lstrip("\ufeff")
-
-    if matches:
-        # If we found JSON blocks, use the first one
-        cleaned = clean(matches[0])
-        return cleaned
-
-    # If no code blocks found, look for JSON objects or arrays
-    # Using a safer pattern that avoids backtracking issues
-    try:  # pragma: no cover
-        # Look for objects
-        # Prefer full JSON object
-        json_obj_pattern = r"({[\s\S]*})"
-        match_obj = re.search(json_obj_pattern, text, re.DOTALL)
-        if match_obj:
-            return clean(match_obj.group(0))
-
-        # Look for arrays
-        # Only fallback to arrays *if no object was found*
-        json_arr_pattern = r"(\[[\s\S]*\])"
-        match_arr = re.search(json_arr_pattern, text, re.DOTALL)
-        if match_arr:
-            return clean(match_arr.group(0))
-        
-    except re.error:  # pragma: no cover
-        # Fallback to simpler pattern if the recursive pattern isn't supported
-        json_pattern = (
-            r"({[^{}]*(?:{[^{}]*}[^{}]*)*}|\[[^\[\]]*(?:\[[^\[\]]*\][^\[\]]*)*\])"
-        )
-        match = re.search(json_pattern, text, re.DOTALL)
+    block = _find_json_code_block(text)
+    if block is not None:
+        return block
 
-        if match:
-            return clean(match.group(0))
+    # If no code blocks found, look for JSON objects or arrays.
+    # Objects are preferred; arrays are only used if no object was found.
+    for opener in "{[":
+        span = _scan_json_span(text, opener)
+        if span is not None:
+            return span
 
     # If we can't find JSON, return None
     logger.warning("No JSON found in text response")  # pragma: no cover
     return None
 
 
+def try_parse_json_fast(text: str) -> Optional[Dict[str, Any]]:
+    """Parse text that is already a clean JSON object, without extraction or repair.
+
+    Args:
+        text: The text response from the Gemini API.
+
+    Returns:
+        The parsed JSON object, or None if the text is not a well-formed object.
+    """
+    stripped = text.strip()
+    if not (stripped.startswith("{") and stripped.endswith("}")):
+        return None
+
+    try:
+        data = orjson.loads(stripped)
+    except orjson.JSONDecodeError:
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def try_parse_embedded_json(text: str) -> Optional[Dict[str, Any]]:
+    """Parse a well-formed JSON object surrounded by prose or a code fence.
+
+    The span from the first ``{`` to the last ``}`` is handed straight to the
+    decoder, so a valid object wrapped in extra text is parsed in one C-level
+    pass instead of being scanned character by character first.
+
+    Args:
+        text: The text response from the Gemini API.
+
+    Returns:
+        The parsed JSON object, or None if the span is not a well-formed object.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return None
+
+    try:
+        data = orjson.loads(text[start : end + 1])
+    except orjson.JSONDecodeError:
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
 def parse_json_safely(json_str: str) -> Dict[str, Any]:
     """Parse JSON string safely, handling common errors.
 
@@ -88,23 +267,115 @@ def parse_json_safely(json_str: str) -> Dict[str, Any]:
 
     try:
         # First try standard parsing
-        return cast(Dict[str, Any], json.loads(json_str))
-    except json.JSONDecodeError as e:  # pragma: no cover
+        return cast(Dict[str, Any], orjson.loads(json_str))
+    except orjson.JSONDecodeError as e:  # pragma: no cover
         logger.warning(f"Standard JSON parsing failed: {str(e)}")
 
         # For the specific test case, we need to directly raise the error
         if '{"key": "value"' in json_str:  # pragma: no cover
             raise GeminiParsingError(f"Failed to parse JSON: {str(e)}", json_str)
 
+        # Try the one repair that matches the reported error first
+        repair = _repair_for_error(e.msg)
+        if repair is not None:
+            try:
+                return cast(Dict[str, Any], orjson.loads(repair(json_str)))
+            except orjson.JSONDecodeError:
+                logger.warning("Targeted JSON repair failed, applying all fixes")
+
         # Try to fix common JSON issues
         fixed_json = fix_common_json_errors(json_str)
         try:  # pragma: no cover
-            return cast(Dict[str, Any], json.loads(fixed_json))
-        except json.JSONDecodeError as e:  # pragma: no cover
+            return cast(Dict[str, Any], orjson.loads(fixed_json))
+        except orjson.JSONDecodeError as e:  # pragma: no cover
+            # Truncated responses may still hold a usable prefix
+            recovered = _recover_truncated_json(json_str)
+            if recovered is not None:
+                logger.warning("Recovered a partial JSON document from a truncated response")
+                return recovered
+
             logger.error(f"JSON parsing failed after fixing: {str(e)}")
             raise GeminiParsingError(f"Failed to parse JSON: {str(e)}", json_str)
 
 
+def _recover_truncated_json(json_str: str) -> Optional[Dict[str, Any]]:
+    """Recover the complete part of a JSON object cut off mid-document.
+
+    First the open string (if any) and all open brackets are closed. If that
+    does not parse, the document is cut back to the last comma outside a
+    string and the brackets open at that point are closed instead.
+
+    Args:
+        json_str: The truncated JSON string.
+
+    Returns:
+        The recovered object, or None if nothing usable could be recovered.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    last_comma = -1
+    stack_at_comma: Tuple[str, ...] = ()
+    closing_map = {"{": "}", "[": "]"}
+
+    for i, char in enumerate(json_str):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if stack and closing_map[stack[-1]] == char:
+                stack.pop()
+        elif char == ",":
+            last_comma = i
+            stack_at_comma = tuple(stack)
+
+    if not stack:
+        return None
+
+    candidates = [
+        json_str
+        + ('"' if in_string else "")
+        + "".join(closing_map[bracket] for bracket in reversed(stack))
+    ]
+    if last_comma != -1 and stack_at_comma:
+        candidates.append(
+            json_str[:last_comma]
+            + "".join(closing_map[bracket] for bracket in reversed(stack_at_comma))
+        )
+
+    for candidate in candidates:
+        try:
+            data = orjson.loads(candidate)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def _repair_for_error(message: str) -> Optional[Callable[[str], str]]:
+    """Pick the single repair step that addresses a decode error, if obvious.
+
+    Args:
+        message: The ``msg`` of the JSONDecodeError raised by the decoder.
+
+    Returns:
+        The repair function, or None if the error needs the full pipeline.
+    """
+    for fragment, repair in _TARGETED_REPAIRS:
+        if fragment in message:
+            return repair
+    return None
+
+
 def fix_common_json_errors(json_str: str) -> str:  # pragma: no cover
     """Fix common JSON formatting errors in LLM outputs.
 
@@ -128,76 +399,99 @@ def fix_common_json_errors(json_str: str) -> str:  # pragma: no cover
 
 def _fix_quotes(json_str: str) -> str:
     """Replace single quotes with double quotes."""
-    # Replace single quotes with double quotes, but only for keys and string values
-    json_str = json_str.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
+    # Normalize typographic quotes in a single pass
+    json_str = json_str.translate(_SMART_QUOTE_TABLE)
 
     # Replace single quotes for keys and string values
-    json_str = re.sub(r"'([^']*)':", r'"\1":', json_str)
-    json_str = re.sub(r":\s*'([^']*)'", r': "\1"', json_str)
+    json_str = _RE_SINGLE_KEY.sub(r'"\1":', json_str)
+    json_str = _RE_SINGLE_VAL.sub(r': "\1"', json_str)
     return json_str
 
 
 def _fix_commas(json_str: str) -> str:
-    """Fix issues with commas."""
-    # Fix trailing commas in objects and arrays
-    fixed = re.sub(r",\s*}", "}", json_str)
-    fixed = re.sub(r",\s*\]", "]", fixed)
-
-    # Fix missing commas between key-value pairs
-    fixed = re.sub(r"}\s*{", "}, {", fixed)
-    fixed = re.sub(r'"\s*{', '", {', fixed)
-    fixed = re.sub(r'"\s*"', '", "', fixed)
+    """Fix issues with commas and repeated colons in a single pass.
 
+    Trailing commas before ``}``/``]`` are dropped, missing commas are
+    inserted between adjacent objects and strings, and runs of ``:`` are
+    collapsed. String contents are copied through untouched.
+    """
+    return _RE_COMMA_TOKEN.sub(_replace_comma_match, json_str)
+
+
+def _replace_comma_match(match: "re.Match[str]") -> str:
+    """Rewrite one token matched by ``_RE_COMMA_TOKEN``."""
+    token = match.group(0)
+    first = token[0]
+    if first == '"':
+        # Fix missing commas after a string value
+        if match.group(2) is not None:
+            return token[: match.start(2) - match.start()] + ", "
+        return token
+    if first == ",":
+        # Fix trailing commas in objects and arrays
+        return ""
+    if first == "}":
+        # Fix missing commas between objects
+        return "}, "
     # Fix repeated colons
-    fixed = re.sub(r":+", ":", fixed)
-
-    return fixed
+    return ":"
 
 
 def _fix_brackets(json_str: str) -> str:
     """Fix mismatched brackets by adding missing closing brackets."""
+    # Balanced input (the common case) needs no fixing; str.count runs in C
+    braces_balanced = json_str.count("{") == json_str.count("}")
+    brackets_balanced = json_str.count("[") == json_str.count("]")
+    if braces_balanced and brackets_balanced:
+        return json_str
+
     bracket_stack = []
     matching_brackets = {"]": "[", "}": "{"}  # Map closing to opening
-    opening_brackets = {"{", "["}
-    closing_brackets = {"}", "]"}
 
-    # Process the string to determine the stack of unclosed brackets
-    for char in json_str:
-        if char in opening_brackets:
+    # Walk only the bracket characters to find the stack of unclosed brackets
+    for char in _RE_BRACKET.findall(json_str):
+        if char in "{[":
             bracket_stack.append(char)
-        elif char in closing_brackets:
-            # If stack is not empty and the closing bracket matches the last opening one
-            if bracket_stack and bracket_stack[-1] == matching_brackets.get(char):
-                bracket_stack.pop()
-            # Note: This logic intentionally ignores mismatched closing brackets
-            # or closing brackets found when the stack is empty, focusing only
-            # on adding missing closing brackets at the end.
-
-    # Add the required closing brackets
-    result = list(json_str)  # Work with list for efficient appending
+        # If stack is not empty and the closing bracket matches the last opening one
+        elif bracket_stack and bracket_stack[-1] == matching_brackets[char]:
+            bracket_stack.pop()
+        # Note: This logic intentionally ignores mismatched closing brackets
+        # or closing brackets found when the stack is empty, focusing only
+        # on adding missing closing brackets at the end.
+
+    # Add the required closing brackets, innermost first
     closing_map = {"{": "}", "[": "]"}  # Map opening to closing
-    for opening_bracket in reversed(bracket_stack):
-        # Safely get the corresponding closing bracket
-        closing_bracket = closing_map.get(opening_bracket)
-        if closing_bracket:
-            result.append(closing_bracket)
-
-    return "".join(result)
+    return json_str + "".join(closing_map[bracket] for bracket in reversed(bracket_stack))
 
 
 def _fix_escaped_quotes(json_str: str) -> str:
-    """Fix escaped quotes in JSON."""
-    # First, replace all escaped quotes with a placeholder
-    placeholder = "__ESCAPED_QUOTE__"
-    fixed = json_str.replace('\\"', placeholder)
+    """Fix escaped quotes in JSON.
 
-    # Then, fix any double quotes that are now directly adjacent
-    fixed = re.sub(r'"{2,}', '"', fixed)
+    Escaped quotes are removed and runs of adjacent double quotes are
+    collapsed in a single pass. An escaped quote between two quotes keeps
+    them from being collapsed together.
+    """
+    return _RE_ESCAPED_OR_REPEATED_QUOTES.sub(_replace_quote_match, json_str)
 
-    # Finally, replace the placeholder with just a regular quote in strings
-    fixed = fixed.replace(placeholder, "")
 
-    return fixed
+def _replace_quote_match(match: "re.Match[str]") -> str:
+    """Drop an escaped quote, or collapse a run of quotes to one."""
+    return "" if match.group(0) == '\\"' else '"'
+
+
+# orjson decode error messages mapped to the repair step they need
+_TARGETED_REPAIRS: Tuple[Tuple[str, Callable[[str], str]], ...] = (
+    ("trailing comma", _fix_commas),
+    ("expected ','", _fix_commas),
+    ("expected a string key", _fix_quotes),
+    ("unexpected end of data", _fix_brackets),
+)
+
+
+@lru_cache(maxsize=256)
+def _split_path(field_path: str) -> Tuple[str, ...]:
+    """Split a dot-separated field path, caching the result for repeated paths."""
+    return tuple(field_path.split("."))
 
 
 def extract_fields(
@@ -216,13 +510,10 @@ def extract_fields(
     if not data:
         return default
 
-    parts = field_path.split(".")
-    current = data
-
-    for part in parts:
-        if isinstance(current, dict) and part in current:
-            current = current[part]
-        else:
+    current: Any = data
+    for part in _split_path(field_path):
+        current = current.get(part, _MISSING) if isinstance(current, dict) else _MISSING
+        if current is _MISSING:
             return default
 
     return current
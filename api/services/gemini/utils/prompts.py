@@ -0,0 +1,60 @@
+"""
+Prompt template rendering for Gemini API services.
+"""
+
+import string
+from typing import Any, List, Tuple
+
+
+class PreparedPrompt:
+    """A ``str.format`` template parsed once and rendered by concatenation.
+
+    ``str.format`` re-parses its template on every call, which for the long
+    prompts sent to Gemini (full of ``{{``/``}}`` JSON escapes) costs far more
+    than the substitution itself. The template is split into literal text and
+    field names up front, so rendering only joins the pieces.
+
+    Only plain named fields (``{name}``) are supported.
+    """
+
+    __slots__ = ("_literals", "_fields")
+
+    def __init__(self, template: str) -> None:
+        """Parse the template.
+
+        Args:
+            template: A ``str.format`` template using plain named fields.
+
+        Raises:
+            ValueError: If a field is positional or has a conversion or format spec.
+        """
+        literals: List[str] = [""]
+        fields: List[str] = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            literals[-1] += literal
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            fields.append(field)
+            literals.append("")
+        self._literals: Tuple[str, ...] = tuple(literals)
+        self._fields: Tuple[str, ...] = tuple(fields)
+
+    def format(self, **values: Any) -> str:
+        """Render the template.
+
+        Args:
+            values: A value for every field in the template.
+
+        Returns:
+            The rendered prompt, identical to ``template.format(**values)``.
+
+        Raises:
+            KeyError: If a field has no value.
+        """
+        parts = [self._literals[0]]
+        for field, literal in zip(self._fields, self._literals[1:]):
+            parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
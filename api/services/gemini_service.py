@@ -2,15 +2,44 @@
 Main service for Gemini API integration.
 """
 
+import asyncio
+import logging
 import os
-from typing import Optional
+from datetime import datetime
+from typing import Any, List, Optional, TypeVar, Union
+from uuid import uuid4
 
-from api.services.gemini.exceptions import GeminiAPIKeyMissingError
+from api.services.gemini.cache import ResponseCache, normalize_text
+from api.services.gemini.exceptions import GeminiAPIKeyMissingError, GeminiServiceException
+from api.services.gemini.batch_service import FoodBatchJobService
 from api.services.gemini.food_service import FoodAnalysisService
 from api.services.gemini.exercise_service import ExerciseAnalysisService
-from api.models.food_analysis import FoodAnalysisResult
+from api.services.gemini.utils.coalescing import RequestCoalescer
+from api.models.food_analysis import FoodAnalysisResult, FoodBatchJob
 from api.models.exercise_analysis import ExerciseAnalysisResult
 
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+ResultT = TypeVar("ResultT", FoodAnalysisResult, ExerciseAnalysisResult)
+
+
+def _fresh_copy(result: ResultT) -> ResultT:
+    """Deep-copy a shared result, giving it its own id and timestamp.
+
+    The copy shares no ingredients or nested dicts with the original, so one
+    caller changing its result cannot affect another's.
+    """
+    return result.model_copy(
+        deep=True, update={"id": str(uuid4()), "timestamp": datetime.now()}
+    )
+
+
+def _dump_cacheable(result: Union[FoodAnalysisResult, ExerciseAnalysisResult]) -> str:
+    """Serialize a result for caching, leaving out its per-analysis id and timestamp."""
+    return result.model_dump_json(exclude={"id", "timestamp"})
+
 
 class GeminiService:
     """Main service for Gemini API integration.
@@ -19,8 +48,15 @@ class GeminiService:
     specialized tasks to dedicated service classes:
     - FoodAnalysisService for food-related analysis
     - ExerciseAnalysisService for exercise-related analysis
+    - FoodBatchJobService for bulk food analysis through Gemini Batch Mode
     """
 
+    # Maximum number of Gemini calls a single batch request runs at once
+    batch_concurrency: int = 5
+
+    # Whether __init__ found an API key; read once instead of on every health check
+    _has_api_key: bool = False
+
     def __init__(self):
         """Initialize the Gemini service.
 
@@ -30,10 +66,32 @@ class GeminiService:
         # Check if API key is set
         if not os.getenv("GOOGLE_API_KEY"):
             raise GeminiAPIKeyMissingError()
+        self._has_api_key = True
 
-        # Initialize specialized services
+        # Initialize specialized services. Exercise analysis reuses the food
+        # service's models so both share one pool of Gemini connections.
         self.food_service = FoodAnalysisService()
-        self.exercise_service = ExerciseAnalysisService()
+        self.exercise_service = ExerciseAnalysisService(
+            text_llm=self.food_service.text_llm,
+            multimodal_llm=self.food_service.multimodal_llm,
+        )
+        self.food_batch_service = FoodBatchJobService(self.food_service)
+
+        # Successful text analyses, stored as JSON without their id and timestamp
+        self._food_text_cache: ResponseCache[str] = ResponseCache()
+        self._exercise_cache: ResponseCache[str] = ResponseCache()
+
+        # Concurrent identical text analyses share a single Gemini call
+        self._food_text_inflight: RequestCoalescer[FoodAnalysisResult] = RequestCoalescer(
+            copy_result=_fresh_copy
+        )
+        self._exercise_inflight: RequestCoalescer[ExerciseAnalysisResult] = RequestCoalescer(
+            copy_result=_fresh_copy
+        )
+
+    async def aclose(self) -> None:
+        """Close the shared Gemini and Supabase connections on application shutdown."""
+        await self.food_service.aclose()
 
     async def check_health(self) -> bool:
         """Check if the Gemini service is healthy.
@@ -41,14 +99,18 @@ class GeminiService:
         Returns:
             True if the service is healthy, False otherwise.
         """
-        # Basic check that just ensures API key is set
-        return os.getenv("GOOGLE_API_KEY") is not None
+        # Basic check that just ensures the service started with an API key
+        return self._has_api_key
 
     # Food analysis methods
 
     async def analyze_food_by_text(self, description: str) -> FoodAnalysisResult:
         """Analyze food from a text description.
 
+        Identical descriptions (ignoring case and whitespace) are answered from
+        a cache of successful results, and concurrent identical requests share
+        one Gemini call. Every caller gets its own id and timestamp.
+
         Args:
             description: The food description.
 
@@ -58,7 +120,73 @@ class GeminiService:
         Raises:
             GeminiServiceException: If the analysis fails.
         """
-        return await self.food_service.analyze_by_text(description)
+        cache_key = ResponseCache.make_key(normalize_text(description))
+        cached = self._food_text_cache.get(cache_key)
+        if cached is not None:
+            return FoodAnalysisResult.model_validate_json(cached)
+
+        async def analyze() -> FoodAnalysisResult:
+            result = await self.food_service.analyze_by_text(description)
+            if isinstance(result, FoodAnalysisResult) and result.error is None:
+                self._food_text_cache.set(cache_key, _dump_cacheable(result))
+            return result
+
+        return await self._food_text_inflight.run(cache_key, analyze)
+
+    async def analyze_food_batch(
+        self, descriptions: List[str]
+    ) -> List[FoodAnalysisResult]:
+        """Analyze several food descriptions concurrently.
+
+        At most ``batch_concurrency`` analyses run at once, each going through
+        the same cache as single analyses. A failure for one description is
+        returned as an error result instead of failing the batch.
+
+        Args:
+            descriptions: The food descriptions.
+
+        Returns:
+            One food analysis result per description, in the same order.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def analyze(description: str) -> FoodAnalysisResult:
+            async with semaphore:
+                try:
+                    return await self.analyze_food_by_text(description)
+                except GeminiServiceException as e:
+                    logger.error(f"Batch food analysis failed for one item: {e.message}")
+                    return FoodAnalysisResult(food_name="Unknown", error=e.message)
+
+        return list(await asyncio.gather(*(analyze(d) for d in descriptions)))
+
+    async def submit_food_batch_job(self, descriptions: List[str]) -> FoodBatchJob:
+        """Submit a Gemini batch job analyzing many food descriptions.
+
+        Args:
+            descriptions: The food descriptions.
+
+        Returns:
+            The newly created job.
+
+        Raises:
+            GeminiServiceException: If the job cannot be created.
+        """
+        return await self.food_batch_service.submit(descriptions)
+
+    async def get_food_batch_job(self, job_id: str) -> FoodBatchJob:
+        """Get a food batch job, with its results once it has succeeded.
+
+        Args:
+            job_id: The job identifier.
+
+        Returns:
+            The job.
+
+        Raises:
+            GeminiServiceException: If the job cannot be read.
+        """
+        return await self.food_batch_service.get(job_id)
 
     async def analyze_food_by_image(self, image_file) -> FoodAnalysisResult:
         """Analyze food from an image.
@@ -74,6 +202,17 @@ class GeminiService:
         """
         return await self.food_service.analyze_by_image(image_file)
 
+    async def analyze_food_by_images(self, image_files: List[Any]) -> List[FoodAnalysisResult]:
+        """Analyze several food images with one Gemini request.
+
+        Args:
+            image_files: The image files (file-like objects).
+
+        Returns:
+            One food analysis result per image, in the same order.
+        """
+        return await self.food_service.analyze_by_images(image_files)
+
     async def analyze_nutrition_label(
         self, image_file, servings: float = 1.0
     ) -> FoodAnalysisResult:
@@ -118,14 +257,76 @@ class GeminiService:
         user_age: Optional[int] = None,
         user_gender: Optional[str] = None
     ) -> ExerciseAnalysisResult:
-        """Analyze an exercise description."""
-        return await self.exercise_service.analyze(
-            description, 
-            user_weight_kg,
-            user_height_cm,
-            user_age,
-            user_gender
+        """Analyze an exercise description.
+
+        Successful results are cached per description and user profile, and
+        concurrent identical requests share one Gemini call.
+        """
+        cache_key = ResponseCache.make_key(
+            normalize_text(description),
+            repr((user_weight_kg, user_height_cm, user_age, user_gender)),
         )
+        cached = self._exercise_cache.get(cache_key)
+        if cached is not None:
+            return ExerciseAnalysisResult.model_validate_json(cached)
+
+        async def analyze() -> ExerciseAnalysisResult:
+            result = await self.exercise_service.analyze(
+                description, 
+                user_weight_kg,
+                user_height_cm,
+                user_age,
+                user_gender
+            )
+            if isinstance(result, ExerciseAnalysisResult) and result.error is None:
+                self._exercise_cache.set(cache_key, _dump_cacheable(result))
+            return result
+
+        return await self._exercise_inflight.run(cache_key, analyze)
+
+    async def analyze_exercise_batch(
+        self,
+        descriptions: List[str],
+        user_weight_kg: Optional[float] = None,
+        user_height_cm: Optional[float] = None,
+        user_age: Optional[int] = None,
+        user_gender: Optional[str] = None,
+    ) -> List[ExerciseAnalysisResult]:
+        """Analyze several exercise descriptions for one user concurrently.
+
+        At most ``batch_concurrency`` analyses run at once. A failure for one
+        description is returned as an error result instead of failing the batch.
+
+        Args:
+            descriptions: The exercise descriptions.
+            user_weight_kg: The user's weight in kilograms.
+            user_height_cm: The user's height in centimeters.
+            user_age: The user's age in years.
+            user_gender: The user's gender.
+
+        Returns:
+            One exercise analysis result per description, in the same order.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def analyze(description: str) -> ExerciseAnalysisResult:
+            async with semaphore:
+                try:
+                    return await self.analyze_exercise(
+                        description, user_weight_kg, user_height_cm, user_age, user_gender
+                    )
+                except GeminiServiceException as e:
+                    logger.error(f"Batch exercise analysis failed for one item: {e.message}")
+                    return ExerciseAnalysisResult(
+                        exercise_type="unknown",
+                        calories_burned=0,
+                        duration="unknown",
+                        intensity="unknown",
+                        met_value=0.0,
+                        error=e.message,
+                    )
+
+        return list(await asyncio.gather(*(analyze(d) for d in descriptions)))
 
     async def correct_exercise_analysis(
         self, 
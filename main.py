@@ -5,12 +5,14 @@ Main FastAPI application for PockEat API.
 from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import json
 import logging
 import uvicorn
 from dotenv import load_dotenv
 import traceback
 import psutil
 import time
+from contextlib import asynccontextmanager
 from starlette.middleware.base import BaseHTTPMiddleware
 
 # Load environment variables
@@ -83,11 +85,34 @@ class AuthMiddleware(BaseHTTPMiddleware):
         return await call_next(request)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare shared resources on startup and close them on shutdown."""
+    # Import here to avoid circular imports
+    import api.routes
+
+    # The first non-blocking sample has no baseline and always reads 0.0
+    psutil.cpu_percent(interval=None)
+
+    # Build the Gemini service at boot so configuration problems surface in
+    # the startup logs; if this fails, the first request retries it
+    try:
+        await api.routes.get_gemini_service()
+    except HTTPException:
+        logger.warning("Gemini service is unavailable at startup")
+
+    yield
+
+    if api.routes.gemini_service is not None:
+        await api.routes.gemini_service.aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="PockEat API",
     description="API for food and exercise analysis using Google's Gemini models",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -117,11 +142,17 @@ from api.routes import router as api_router
 app.include_router(api_router, prefix="/api")
 
 
+# The root health check never changes, so its body is encoded once
+_ROOT_BODY = json.dumps(
+    {"status": "healthy", "message": "PockEat API is running", "version": app.version}
+).encode()
+
+
 # Root endpoint serves as a health check
 @app.get("/", tags=["Health"])
-async def root():
+async def root() -> Response:
     """Root endpoint serving as a health check."""
-    return {"status": "healthy", "message": "PockEat API is running", "version": app.version}
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 # Health check endpoint
@@ -140,7 +171,8 @@ async def health_check():  # pragma: no cover
         "timestamp": time.time(),
         "system": {
             "memory_usage_percent": memory.percent,
-            "cpu_usage_percent": psutil.cpu_percent(interval=0.1),
+            # Non-blocking: usage since the previous call, so the event loop never sleeps here
+            "cpu_usage_percent": psutil.cpu_percent(interval=None),
         },
         "services": {"gemini": "available" if api_key_set else "unavailable"},
         "environment": os.getenv("ENVIRONMENT", "development"),
@@ -0,0 +1,11 @@
+-- Index nutrition_data.food for the RAG lookup in FoodAnalysisService.
+--
+-- The service matches foods with ILIKE '%name%', which cannot use a btree
+-- index and falls back to a sequential scan. A pg_trgm GIN index serves
+-- leading-wildcard ILIKE patterns directly.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS nutrition_data_food_trgm_idx
+    ON public.nutrition_data
+    USING gin (food gin_trgm_ops);
@@ -12,7 +12,7 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from fastapi.testclient import TestClient
 from main import app
-from api.models.food_analysis import FoodAnalysisResult, NutritionInfo, Ingredient
+from api.models.food_analysis import FoodAnalysisResult, FoodBatchJob, NutritionInfo, Ingredient
 from api.models.exercise_analysis import ExerciseAnalysisResult
 from api.services.gemini_service import GeminiService
 
@@ -126,6 +126,48 @@ class TestAPIRoutes:
         assert response.status_code == 500
         assert "detail" in response.json()
 
+    def test_analyze_food_batch(self, client):
+        """Test analyzing several foods by text in one request."""
+        mock_gemini_service.analyze_food_batch.return_value = [
+            FoodAnalysisResult(food_name="Food 1"),
+            FoodAnalysisResult(food_name="Food 2"),
+        ]
+
+        response = client.post(
+            "/api/food/analyze/batch",
+            json={"descriptions": ["food 1", "food 2"]}
+        )
+        assert response.status_code == 200
+        assert [item["food_name"] for item in response.json()] == ["Food 1", "Food 2"]
+        mock_gemini_service.analyze_food_batch.assert_called_with(["food 1", "food 2"])
+
+    def test_analyze_food_batch_empty(self, client):
+        """Test an empty batch is rejected."""
+        response = client.post("/api/food/analyze/batch", json={"descriptions": []})
+        assert response.status_code == 422
+
+    def test_food_batch_job(self, client):
+        """Test submitting a food batch job and reading its results."""
+        mock_gemini_service.submit_food_batch_job.return_value = FoodBatchJob(
+            id="abc", state="JOB_STATE_PENDING"
+        )
+        response = client.post(
+            "/api/food/batch-jobs", json={"descriptions": ["food 1", "food 2"]}
+        )
+        assert response.status_code == 202
+        assert response.json()["id"] == "abc"
+        mock_gemini_service.submit_food_batch_job.assert_called_with(["food 1", "food 2"])
+
+        mock_gemini_service.get_food_batch_job.return_value = FoodBatchJob(
+            id="abc",
+            state="JOB_STATE_SUCCEEDED",
+            results=[FoodAnalysisResult(food_name="Food 1")],
+        )
+        response = client.get("/api/food/batch-jobs/abc")
+        assert response.status_code == 200
+        assert response.json()["results"][0]["food_name"] == "Food 1"
+        mock_gemini_service.get_food_batch_job.assert_called_with("abc")
+
     def test_analyze_exercise(self, client):
         """Test analyzing exercise."""
         mock_result = ExerciseAnalysisResult(
@@ -177,7 +219,7 @@ class TestAPIRoutes:
         mock_gemini_service.correct_food_analysis.return_value = corrected_result
         
         # Convert the previous result to dict and remove the timestamp field
-        previous_result_dict = previous_result.dict()
+        previous_result_dict = previous_result.model_dump()
         if "timestamp" in previous_result_dict:
             previous_result_dict.pop("timestamp")
             
@@ -212,7 +254,7 @@ class TestAPIRoutes:
         mock_gemini_service.correct_exercise_analysis.return_value = corrected_result
         
         # Convert the previous result to dict and remove the timestamp field
-        previous_result_dict = previous_result.dict()
+        previous_result_dict = previous_result.model_dump()
         if "timestamp" in previous_result_dict:
             previous_result_dict.pop("timestamp")
             
@@ -284,4 +326,127 @@ class TestAPIRoutes:
         assert response.status_code == 200
         assert response.json()["food_name"] == "Nutrition Facts"
         assert response.json()["nutrition_info"]["calories"] == 200
-        assert response.json()["nutrition_info"]["protein"] == 15 
\ No newline at end of file
+        assert response.json()["nutrition_info"]["protein"] == 15
+
+    def test_gemini_service_created_on_first_use(self, client):
+        """Test the shared service is created lazily and then reused."""
+        with patch("api.routes.gemini_service", None), \
+             patch("api.routes.GeminiService", return_value=mock_gemini_service) as mock_init:
+            mock_gemini_service.check_health.return_value = True
+
+            assert client.get("/api/health").status_code == 200
+            assert client.get("/api/health").status_code == 200
+            mock_init.assert_called_once_with()
+
+    def test_gemini_service_initialization_failure(self, client):
+        """Test a failed initialization returns 503 and is retried."""
+        with patch("api.routes.gemini_service", None), \
+             patch("api.routes.GeminiService", side_effect=Exception("missing key")) as mock_init:
+            response = client.get("/api/health")
+            assert response.status_code == 503
+            assert response.json()["detail"] == "Gemini service is unavailable"
+
+            client.get("/api/health")
+            assert mock_init.call_count == 2
+
+    def test_exercise_correct_declares_response_model(self, client):
+        """Test the exercise correction route is serialized through its response model."""
+        schema = client.get("/openapi.json").json()
+        response = schema["paths"]["/api/exercise/correct"]["post"]["responses"]["200"]
+        assert response["content"]["application/json"]["schema"] == {
+            "$ref": "#/components/schemas/ExerciseAnalysisResult"
+        }
+
+    def test_analyze_food_by_image_too_large(self, client):
+        """Test oversized image uploads are rejected before analysis."""
+        mock_gemini_service.analyze_food_by_image.reset_mock()
+        with patch("api.routes.MAX_IMAGE_UPLOAD_BYTES", 10):
+            response = client.post(
+                "/api/food/analyze/image",
+                files={"image": ("food.jpg", b"x" * 11, "image/jpeg")},
+            )
+
+        assert response.status_code == 413
+        mock_gemini_service.analyze_food_by_image.assert_not_called()
+
+    def test_analyze_food_by_images(self, client):
+        """Test several images are analyzed in one call and the count is capped."""
+        mock_gemini_service.analyze_food_by_images.return_value = [
+            FoodAnalysisResult(food_name="Pizza"),
+            FoodAnalysisResult(food_name="Salad"),
+        ]
+        files = [
+            ("images", ("a.jpg", b"a", "image/jpeg")),
+            ("images", ("b.jpg", b"b", "image/jpeg")),
+        ]
+        response = client.post("/api/food/analyze/image/batch", files=files)
+
+        assert response.status_code == 200
+        assert [item["food_name"] for item in response.json()] == ["Pizza", "Salad"]
+
+        with patch("api.routes.MAX_IMAGES_PER_BATCH", 1):
+            response = client.post("/api/food/analyze/image/batch", files=files)
+        assert response.status_code == 400
+
+    def test_analyze_exercise_rejects_non_positive_metrics(self, client):
+        """Test non-positive health metrics are rejected with 422."""
+        response = client.post(
+            "/api/exercise/analyze",
+            json={"description": "running for 30 minutes", "user_weight_kg": -70},
+        )
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "user_weight_kg"]
+
+    def test_analyze_nutrition_label_rejects_zero_servings(self, client):
+        """Test a non-positive servings value is rejected with 422."""
+        response = client.post(
+            "/api/food/analyze/nutrition-label",
+            files={"image": ("nutrition_label.jpg", b"label", "image/jpeg")},
+            data={"servings": "0"},
+        )
+
+        assert response.status_code == 422
+
+    def test_gemini_service_created_at_startup(self):
+        """Test application startup builds the shared service before any request."""
+        with patch("api.routes.gemini_service", None), \
+             patch("api.routes.GeminiService", return_value=mock_gemini_service) as mock_init:
+            with TestClient(app):
+                mock_init.assert_called_once_with()
+
+    def test_health_bodies_match_status(self, client):
+        """Test the pre-encoded health responses carry the expected JSON."""
+        mock_gemini_service.check_health.return_value = False
+        degraded = client.get("/api/health")
+        mock_gemini_service.check_health.return_value = True
+        healthy = client.get("/api/health")
+        root = client.get("/")
+
+        assert degraded.headers["content-type"] == "application/json"
+        assert degraded.json()["message"] == "API is running, but Gemini service is unavailable"
+        assert healthy.json() == {"status": "healthy", "message": "API is running"}
+        assert root.json()["version"] == app.version
+
+    def test_analyze_exercise_batch(self, client):
+        """Test analyzing several exercises in one request."""
+        mock_gemini_service.analyze_exercise_batch.return_value = [
+            ExerciseAnalysisResult(
+                exercise_type="Running",
+                calories_burned=300,
+                duration="30 minutes",
+                intensity="High",
+                met_value=9.8,
+            )
+        ]
+
+        response = client.post(
+            "/api/exercise/analyze/batch",
+            json={"descriptions": ["running for 30 minutes"], "user_weight_kg": 70},
+        )
+
+        assert response.status_code == 200
+        assert response.json()[0]["exercise_type"] == "Running"
+        mock_gemini_service.analyze_exercise_batch.assert_called_with(
+            ["running for 30 minutes"], 70, None, None, None
+        )
@@ -132,6 +132,11 @@ class TestFoodAnalysisRequest:
         with pytest.raises(Exception):
             FoodAnalysisRequest()
 
+    def test_food_analysis_request_schema_example(self):
+        """Test the request example is published in the JSON schema."""
+        schema = FoodAnalysisRequest.model_json_schema()
+        assert "description" in schema["example"]
+
 class TestFoodCorrectionRequest:
     """Tests for the FoodCorrectionRequest model."""
     
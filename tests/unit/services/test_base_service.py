@@ -2,20 +2,33 @@
 Tests for the BaseLangChainService class.
 """
 
+import asyncio
 import os
 import sys
-import base64
+import weakref
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from io import BytesIO
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
 
 # Add the project root directory to the Python path so we can import
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-from api.services.gemini.base_service import BaseLangChainService
+from api.services.gemini.base_service import BaseLangChainService, _read_max_inflight_requests
 from api.services.gemini.exceptions import GeminiAPIKeyMissingError, InvalidImageError
 
 
+def make_stream(*texts):
+    """Create a mock ``astream`` that yields chunks with the given contents."""
+    async def stream(messages, **kwargs):
+        for text in texts:
+            chunk = MagicMock()
+            chunk.content = text
+            yield chunk
+
+    return MagicMock(side_effect=stream)
+
+
 class TestBaseLangChainService:
     """Test suite for the BaseLangChainService class."""
 
@@ -32,11 +45,8 @@ class TestBaseLangChainService:
     def mock_langchain_llm(self):  # pragma: no cover
         """Mock LangChain LLM."""
         mock = MagicMock()
-        # Set up async mock for ainvoke
-        mock.ainvoke = AsyncMock()
-        response = MagicMock()
-        response.content = '{"test_key": "test_value"}'
-        mock.ainvoke.return_value = response
+        # Set up streaming mock for astream
+        mock.astream = make_stream('{"test_key": "test_value"}')
         return mock
 
     def test_init_missing_api_key(self):
@@ -45,6 +55,29 @@ class TestBaseLangChainService:
             with pytest.raises(GeminiAPIKeyMissingError):
                 BaseLangChainService()
 
+    def test_init_reuses_given_models(self, mock_env):
+        """Test models passed in are reused instead of creating new clients."""
+        text_llm, multimodal_llm = MagicMock(), MagicMock()
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI') as mock_chat:
+            service = BaseLangChainService(text_llm=text_llm, multimodal_llm=multimodal_llm)
+
+            assert service.text_llm is text_llm
+            assert service.multimodal_llm is multimodal_llm
+            mock_chat.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_async_channels(self, mock_env):
+        """Test aclose closes each distinct model's async transport once."""
+        llm = MagicMock()
+        transport = llm.async_client_running.transport
+        transport.close = AsyncMock()
+        service = BaseLangChainService(text_llm=llm, multimodal_llm=llm)
+
+        await service.aclose()
+
+        transport.close.assert_awaited_once()
+        assert llm.async_client_running is None
+
     def test_init_with_api_key(self, mock_env):
         """Test successful initialization with API key."""
         with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI') as mock_chat:
@@ -75,13 +108,7 @@ class TestBaseLangChainService:
             mock_file = BytesIO(image_data)
             
             # Call the method and validate result
-            base64_str = service._read_image_bytes(mock_file)
-            
-            # Check that it's a valid base64 string
-            assert isinstance(base64_str, str)
-            # Should be able to decode it back
-            decoded = base64.b64decode(base64_str)
-            assert decoded == image_data
+            assert service._read_image_bytes(mock_file) == image_data
 
     def test_read_image_bytes_empty_file(self, mock_env):
         """Test reading an empty image file."""
@@ -105,12 +132,7 @@ class TestBaseLangChainService:
             mock_file = MockStringFile()
             
             # Should convert to bytes
-            base64_str = service._read_image_bytes(mock_file)
-            assert isinstance(base64_str, str)
-            
-            # Should be decodable
-            decoded = base64.b64decode(base64_str)
-            assert decoded == b"not bytes but string"
+            assert service._read_image_bytes(mock_file) == b"not bytes but string"
 
     def test_read_image_bytes_exception(self, mock_env):
         """Test handling of exceptions during image reading."""
@@ -130,14 +152,9 @@ class TestBaseLangChainService:
     @pytest.mark.asyncio
     async def test_invoke_text_model(self, mock_env):
         """Test invoking the text model."""
-        # Create a proper AsyncMock for the LLM
+        # Create a streaming mock for the LLM
         mock_llm = MagicMock()
-        mock_llm.ainvoke = AsyncMock()
-        
-        # Configure the mock response
-        mock_response = MagicMock()
-        mock_response.content = "Test response from model"
-        mock_llm.ainvoke.return_value = mock_response
+        mock_llm.astream = make_stream("Test response ", "from model")
         
         with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
             service = BaseLangChainService()
@@ -150,18 +167,18 @@ class TestBaseLangChainService:
             assert result == "Test response from model"
             
             # Verify the LLM was called correctly
-            mock_llm.ainvoke.assert_called_once()
+            mock_llm.astream.assert_called_once()
             # Check we're passing a HumanMessage
-            args = mock_llm.ainvoke.call_args[0][0]
+            args = mock_llm.astream.call_args[0][0]
             assert len(args) == 1
             assert args[0].content == "Test prompt"
 
     @pytest.mark.asyncio
     async def test_invoke_text_model_error(self, mock_env):
         """Test error handling when invoking the text model."""
-        # Create a proper AsyncMock for the LLM
+        # Create a streaming mock for the LLM
         mock_llm = MagicMock()
-        mock_llm.ainvoke = AsyncMock(side_effect=Exception("Model API error"))
+        mock_llm.astream = MagicMock(side_effect=Exception("Model API error"))
         
         with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
             service = BaseLangChainService()
@@ -174,44 +191,55 @@ class TestBaseLangChainService:
     @pytest.mark.asyncio
     async def test_invoke_multimodal_model(self, mock_env):
         """Test invoking the multimodal model with text and image."""
-        # Create a proper AsyncMock for the LLM
+        # Create a streaming mock for the LLM
         mock_llm = MagicMock()
-        mock_llm.ainvoke = AsyncMock()
-        
-        # Configure the mock response
-        mock_response = MagicMock()
-        mock_response.content = "Test response from multimodal model"
-        mock_llm.ainvoke.return_value = mock_response
+        mock_llm.astream = make_stream("Test response from multimodal model")
         
         with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
             service = BaseLangChainService()
             # Replace the LLM with our mock
             service.multimodal_llm = mock_llm
             
-            result = await service._invoke_multimodal_model("Describe this image", "base64_image_string")
+            result = await service._invoke_multimodal_model("Describe this image", b"image bytes")
             
             # Verify correct response
             assert result == "Test response from multimodal model"
             
             # Verify the LLM was called correctly
-            mock_llm.ainvoke.assert_called_once()
+            mock_llm.astream.assert_called_once()
             
             # Check we're passing a HumanMessage with correct content structure
-            args = mock_llm.ainvoke.call_args[0][0]
+            args = mock_llm.astream.call_args[0][0]
             assert len(args) == 1
             content = args[0].content
             assert len(content) == 2
             assert content[0]["type"] == "text"
             assert content[0]["text"] == "Describe this image"
-            assert content[1]["type"] == "image_url"
-            assert "base64_image_string" in content[1]["image_url"]["url"]
+            assert content[1] == {"type": "media", "mime_type": "image/jpeg", "data": b"image bytes"}
+
+    @pytest.mark.asyncio
+    async def test_invoke_multimodal_model_detects_image_type(self, mock_env):
+        """Test images are labelled with the MIME type their leading bytes show."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream('{"food_name": "Apple"}')
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.multimodal_llm = mock_llm
+
+            png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8
+            webp = b"RIFF\x00\x00\x00\x00WEBPVP8 "
+            await service._invoke_multimodal_model_with_images("Describe", [png, webp])
+
+            content = mock_llm.astream.call_args[0][0][0].content
+            assert [part["mime_type"] for part in content[1:]] == ["image/png", "image/webp"]
 
     @pytest.mark.asyncio
     async def test_invoke_multimodal_model_error(self, mock_env):
         """Test error handling when invoking the multimodal model."""
-        # Create a proper AsyncMock for the LLM
+        # Create a streaming mock for the LLM
         mock_llm = MagicMock()
-        mock_llm.ainvoke = AsyncMock(side_effect=Exception("Multimodal API error"))
+        mock_llm.astream = MagicMock(side_effect=Exception("Multimodal API error"))
         
         with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
             service = BaseLangChainService()
@@ -219,4 +247,159 @@ class TestBaseLangChainService:
             service.multimodal_llm = mock_llm
             
             with pytest.raises(Exception, match="Multimodal API error"):
-                await service._invoke_multimodal_model("Describe this image", "base64_image_string") 
\ No newline at end of file
+                await service._invoke_multimodal_model("Describe this image", b"image bytes")
+
+    @pytest.mark.asyncio
+    async def test_invoke_text_model_stops_after_json(self, mock_env):
+        """Test streaming stops once the JSON payload is complete."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream('{"food_name": ', '"Rice"}', "\nExtra explanation")
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.text_llm = mock_llm
+
+            result = await service._invoke_text_model("Test prompt")
+
+            assert result == '{"food_name": "Rice"}'
+
+    @pytest.mark.asyncio
+    async def test_invoke_text_model_passes_response_schema(self, mock_env):
+        """Test a response schema is forwarded to the model call."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream('{"food_name": "Rice"}')
+        schema = {"type": "object", "properties": {"food_name": {"type": "string"}}}
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.text_llm = mock_llm
+
+            await service._invoke_text_model("Test prompt", response_schema=schema)
+
+            assert mock_llm.astream.call_args.kwargs == {"response_schema": schema}
+
+    @pytest.mark.asyncio
+    async def test_invoke_text_model_limits_calls_in_flight(self, mock_env):
+        """Test concurrent model calls wait for a free slot."""
+        active = peak = 0
+
+        async def stream(messages, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            chunk = MagicMock()
+            chunk.content = '{"food_name": "Rice"}'
+            yield chunk
+
+        mock_llm = MagicMock()
+        mock_llm.astream = MagicMock(side_effect=stream)
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'), \
+             patch('api.services.gemini.base_service._MAX_INFLIGHT_REQUESTS', 2), \
+             patch('api.services.gemini.base_service._inflight_slots', weakref.WeakKeyDictionary()):
+            service = BaseLangChainService()
+            service.text_llm = mock_llm
+
+            await asyncio.gather(*(service._invoke_text_model("Test prompt") for _ in range(5)))
+
+            assert peak == 2
+            assert mock_llm.astream.call_count == 5
+
+    @pytest.mark.parametrize("value", ["many", "0", "-3"])
+    def test_max_inflight_requests_falls_back_on_invalid_env(self, value):
+        """Test an invalid GEMINI_MAX_INFLIGHT falls back to the default instead of failing."""
+        with patch.dict(os.environ, {"GEMINI_MAX_INFLIGHT": value}):
+            assert _read_max_inflight_requests() == 32
+
+    def test_max_inflight_requests_reads_env(self):
+        """Test a valid GEMINI_MAX_INFLIGHT sets the limit."""
+        with patch.dict(os.environ, {"GEMINI_MAX_INFLIGHT": "8"}):
+            assert _read_max_inflight_requests() == 8
+
+    @pytest.mark.asyncio
+    async def test_invoke_text_model_retries_transient_errors(self, mock_env):
+        """Test transient Gemini errors are retried until the call succeeds."""
+        succeed = make_stream('{"food_name": "Rice"}').side_effect
+        mock_llm = MagicMock()
+        mock_llm.astream = MagicMock(
+            side_effect=[ServiceUnavailable("busy"), ResourceExhausted("quota"), succeed([])]
+        )
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.text_llm = mock_llm
+            service.retry_max_wait = 0
+
+            result = await service._invoke_text_model("Test prompt")
+
+            assert result == '{"food_name": "Rice"}'
+            assert mock_llm.astream.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_invoke_text_model_gives_up_after_max_attempts(self, mock_env):
+        """Test the last transient error is raised once attempts run out."""
+        mock_llm = MagicMock()
+        mock_llm.astream = MagicMock(side_effect=ServiceUnavailable("busy"))
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.text_llm = mock_llm
+            service.retry_max_wait = 0
+
+            with pytest.raises(ServiceUnavailable):
+                await service._invoke_text_model("Test prompt")
+
+            assert mock_llm.astream.call_count == service.max_attempts
+
+    @pytest.mark.asyncio
+    async def test_invoke_multimodal_model_caches_json_responses(self, mock_env):
+        """Test a repeated image and prompt are answered from the cache."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream('{"food_name": "Rice"}')
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.multimodal_llm = mock_llm
+
+            first = await service._invoke_multimodal_model("Describe", b"image")
+            second = await service._invoke_multimodal_model("Describe", b"image")
+            await service._invoke_multimodal_model("Describe", b"other")
+
+            assert first == second == '{"food_name": "Rice"}'
+            assert mock_llm.astream.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invoke_multimodal_model_hashes_large_images_in_thread(self, mock_env):
+        """Test large images are hashed off the event loop with the same cache key."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream('{"food_name": "Rice"}')
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.multimodal_llm = mock_llm
+
+            await service._invoke_multimodal_model("Describe", b"image")
+            with patch('api.services.gemini.base_service._INLINE_HASH_LIMIT', 0), \
+                    patch('api.services.gemini.base_service.asyncio.to_thread',
+                          wraps=asyncio.to_thread) as to_thread:
+                await service._invoke_multimodal_model("Describe", b"image")
+
+            to_thread.assert_awaited_once()
+            assert mock_llm.astream.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_invoke_multimodal_model_does_not_cache_invalid_json(self, mock_env):
+        """Test responses that are not valid JSON are requested again."""
+        mock_llm = MagicMock()
+        mock_llm.astream = make_stream("Sorry, I cannot help with that")
+
+        with patch('api.services.gemini.base_service.ChatGoogleGenerativeAI'):
+            service = BaseLangChainService()
+            service.multimodal_llm = mock_llm
+
+            await service._invoke_multimodal_model("Describe", b"image")
+            await service._invoke_multimodal_model("Describe", b"image")
+
+            assert mock_llm.astream.call_count == 2
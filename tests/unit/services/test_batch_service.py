@@ -0,0 +1,132 @@
+"""
+Tests for the FoodBatchJobService class.
+"""
+
+import asyncio
+import os
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+# Add the project root directory to the Python path so we can import
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+from api.models.food_analysis import FoodAnalysisResult
+from api.services.gemini.batch_service import FoodBatchJobService
+from api.services.gemini.exceptions import GeminiAPIError
+
+
+class TestFoodBatchJobService:
+    """Test suite for the FoodBatchJobService class."""
+
+    @pytest.fixture
+    def food_service(self):
+        """Create a mock food service."""
+        mock = MagicMock()
+        mock.text_model_name = "models/gemini-test"
+        mock.build_text_analysis_prompt = AsyncMock(side_effect=lambda d: f"Analyze {d}")
+        mock.parse_analysis_response = AsyncMock(
+            side_effect=lambda text, default: FoodAnalysisResult(food_name=text)
+        )
+        return mock
+
+    @pytest.fixture
+    def client(self):
+        """Create a mock Gemini client."""
+        mock = MagicMock()
+        mock.aio.batches.create = AsyncMock()
+        mock.aio.batches.get = AsyncMock()
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_submit_sends_inline_requests(self, food_service, client):
+        """Test every description is sent as one inline request of a single job."""
+        client.aio.batches.create.return_value = genai_types.BatchJob(
+            name="batches/abc", state=genai_types.JobState.JOB_STATE_PENDING
+        )
+        service = FoodBatchJobService(food_service, client=client)
+
+        job = await service.submit(["rice", "tea"])
+
+        assert job.id == "abc"
+        assert job.state == "JOB_STATE_PENDING"
+        assert job.results is None
+        kwargs = client.aio.batches.create.call_args.kwargs
+        assert kwargs["model"] == "models/gemini-test"
+        assert [r["contents"][0]["parts"][0]["text"] for r in kwargs["src"]] == [
+            "Analyze rice",
+            "Analyze tea",
+        ]
+        assert kwargs["src"][0]["config"]["response_mime_type"] == "application/json"
+
+    @pytest.mark.asyncio
+    async def test_submit_bounds_prompt_building(self, food_service, client):
+        """Test at most prompt_concurrency prompts are built at once."""
+        client.aio.batches.create.return_value = genai_types.BatchJob(name="batches/abc")
+        running = peak = 0
+
+        async def build_prompt(description):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return description
+
+        food_service.build_text_analysis_prompt = AsyncMock(side_effect=build_prompt)
+        service = FoodBatchJobService(food_service, client=client)
+        service.prompt_concurrency = 2
+
+        await service.submit([f"food {i}" for i in range(6)])
+
+        assert peak == 2
+        assert len(client.aio.batches.create.call_args.kwargs["src"]) == 6
+
+    @pytest.mark.asyncio
+    async def test_get_parses_results_in_order(self, food_service, client):
+        """Test a succeeded job returns one result per request, with failures as error results."""
+        client.aio.batches.get.return_value = genai_types.BatchJob(
+            name="batches/abc",
+            state=genai_types.JobState.JOB_STATE_SUCCEEDED,
+            dest=genai_types.BatchJobDestination(
+                inlined_responses=[
+                    genai_types.InlinedResponse(
+                        response=genai_types.GenerateContentResponse(
+                            candidates=[
+                                genai_types.Candidate(
+                                    content=genai_types.Content(
+                                        parts=[genai_types.Part(text="Rice")]
+                                    )
+                                )
+                            ]
+                        )
+                    ),
+                    genai_types.InlinedResponse(
+                        error=genai_types.JobError(code=500, message="internal")
+                    ),
+                ]
+            ),
+        )
+        service = FoodBatchJobService(food_service, client=client)
+
+        job = await service.get("abc")
+
+        client.aio.batches.get.assert_awaited_once_with(name="batches/abc")
+        assert job.state == "JOB_STATE_SUCCEEDED"
+        assert [r.food_name for r in job.results] == ["Rice", "Unknown"]
+        assert job.results[1].error == "internal"
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_job(self, food_service, client):
+        """Test a missing job surfaces as a GeminiAPIError with Gemini's status code."""
+        client.aio.batches.get.side_effect = genai_errors.ClientError(
+            404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}}
+        )
+        service = FoodBatchJobService(food_service, client=client)
+
+        with pytest.raises(GeminiAPIError) as exc_info:
+            await service.get("missing")
+        assert exc_info.value.status_code == 404
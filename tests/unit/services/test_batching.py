@@ -0,0 +1,92 @@
+"""
+Tests for the request batching utilities.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+from api.services.gemini.utils.batching import BatchingInvoker
+
+
+class TestBatchingInvoker:
+    """Test suite for the BatchingInvoker class."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_submits_share_one_batch(self):
+        """Test items submitted together are processed in one call, in order."""
+        batch_fn = AsyncMock(side_effect=lambda items: [item.upper() for item in items])
+        invoker = BatchingInvoker(batch_fn, max_wait=0.01)
+
+        results = await asyncio.gather(*(invoker.submit(item) for item in ["a", "b", "c"]))
+
+        assert results == ["A", "B", "C"]
+        batch_fn.assert_awaited_once_with(["a", "b", "c"])
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_immediately(self):
+        """Test batches are split at the maximum batch size."""
+        batch_fn = AsyncMock(side_effect=lambda items: list(items))
+        invoker = BatchingInvoker(batch_fn, max_batch_size=2, max_wait=0.01)
+
+        results = await asyncio.gather(*(invoker.submit(i) for i in range(3)))
+
+        assert results == [0, 1, 2]
+        assert [call.args[0] for call in batch_fn.await_args_list] == [[0, 1], [2]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_submitters(self):
+        """Test per-item exceptions and whole-batch failures are raised to callers."""
+        invoker = BatchingInvoker(
+            AsyncMock(return_value=["ok", ValueError("bad item")]), max_wait=0.01
+        )
+        results = await asyncio.gather(
+            invoker.submit("a"), invoker.submit("b"), return_exceptions=True
+        )
+        assert results[0] == "ok"
+        assert isinstance(results[1], ValueError)
+
+        failing = BatchingInvoker(AsyncMock(side_effect=RuntimeError("down")), max_wait=0.01)
+        with pytest.raises(RuntimeError):
+            await failing.submit("a")
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_merges_queued_items(self):
+        """Test items queued behind the concurrency limit are sent as one batch."""
+        release = asyncio.Event()
+        batches = []
+
+        async def batch_fn(items):
+            batches.append(list(items))
+            if len(batches) == 1:
+                await release.wait()
+            return list(items)
+
+        invoker = BatchingInvoker(batch_fn, max_wait=0.01, max_concurrent_batches=1)
+        first = asyncio.ensure_future(invoker.submit(0))
+        await asyncio.sleep(0.02)
+        queued = [asyncio.ensure_future(invoker.submit(i)) for i in (1, 2)]
+        await asyncio.sleep(0.02)
+        assert batches == [[0]]
+
+        release.set()
+        assert await asyncio.gather(first, *queued) == [0, 1, 2]
+        assert batches == [[0], [1, 2]]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_batch_releases_submitters(self):
+        """Test cancelling a running batch cancels its submitters instead of hanging them."""
+        started = asyncio.Event()
+
+        async def batch_fn(items):
+            started.set()
+            await asyncio.Event().wait()
+
+        invoker = BatchingInvoker(batch_fn, max_wait=0.01)
+        submitted = asyncio.ensure_future(invoker.submit("a"))
+        await started.wait()
+
+        for task in list(invoker._batch_tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(submitted, timeout=1)
@@ -0,0 +1,44 @@
+"""
+Tests for the in-process response cache.
+"""
+
+from unittest.mock import patch
+
+from api.services.gemini.cache import ResponseCache, normalize_text
+
+
+def test_normalize_text():
+    """Test case, whitespace and Unicode width are normalized."""
+    assert normalize_text("  Nasi   GORENG\n") == "nasi goreng"
+    assert normalize_text("Ｒｉｃｅ") == "rice"
+
+
+def test_make_key_separates_parts():
+    """Test keys differ when the same text is split differently."""
+    assert ResponseCache.make_key("ab", "c") != ResponseCache.make_key("a", "bc")
+    assert ResponseCache.make_key("ab", "c") == ResponseCache.make_key("ab", "c")
+
+
+def test_evicts_least_recently_used():
+    """Test the least recently used entry is evicted when full."""
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_entries_expire():
+    """Test entries are dropped once their TTL has elapsed."""
+    cache = ResponseCache(ttl=10.0)
+    with patch('api.services.gemini.cache.time.monotonic', return_value=100.0):
+        cache.set("a", 1)
+    with patch('api.services.gemini.cache.time.monotonic', return_value=105.0):
+        assert cache.get("a") == 1
+    with patch('api.services.gemini.cache.time.monotonic', return_value=110.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0
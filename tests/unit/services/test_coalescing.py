@@ -0,0 +1,60 @@
+"""
+Tests for the in-flight request coalescer.
+"""
+
+import asyncio
+import pytest
+
+from api.services.gemini.utils.coalescing import RequestCoalescer
+
+
+class TestRequestCoalescer:
+    """Test suite for the RequestCoalescer class."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_call(self):
+        """Test concurrent callers with the same key share a single call."""
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        coalescer = RequestCoalescer(copy_result=list)
+        results = await asyncio.gather(*(coalescer.run("key", call) for _ in range(3)))
+
+        assert len(calls) == 1
+        assert results == [["result"]] * 3
+        # Joining callers get their own copy
+        assert results[1] is not results[0]
+        assert len(coalescer) == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_and_later_calls_are_not_shared(self):
+        """Test only concurrent calls with the same key are merged."""
+        calls = []
+
+        async def call():
+            calls.append(1)
+            return len(calls)
+
+        coalescer = RequestCoalescer()
+        await asyncio.gather(coalescer.run("a", call), coalescer.run("b", call))
+        await coalescer.run("a", call)
+
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test a failed call raises for all callers sharing it."""
+        async def call():
+            await asyncio.sleep(0.01)
+            raise ValueError("failed")
+
+        coalescer = RequestCoalescer()
+        results = await asyncio.gather(
+            coalescer.run("key", call), coalescer.run("key", call), return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
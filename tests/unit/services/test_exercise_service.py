@@ -12,7 +12,7 @@ from io import BytesIO
 # Add the project root directory to the Python path so we can import
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-from api.services.gemini.exercise_service import ExerciseAnalysisService
+from api.services.gemini.exercise_service import ExerciseAnalysisService, _EXERCISE_RESPONSE_SCHEMA
 from api.services.gemini.exceptions import GeminiServiceException
 from api.models.exercise_analysis import ExerciseAnalysisResult
 
@@ -105,6 +105,45 @@ class TestExerciseAnalysisService:
         assert service._generate_exercise_analysis_prompt.called
         assert service._parse_exercise_analysis_response.called
 
+    @pytest.mark.asyncio
+    async def test_analyze_passes_response_schema(self, mock_env, service_with_mocks):
+        """Test analysis constrains Gemini's output with the exercise response schema."""
+        service = service_with_mocks
+        service._parse_exercise_analysis_response.return_value = ExerciseAnalysisResult(
+            exercise_type="Running",
+            duration="30 minutes",
+            intensity="Moderate",
+            calories_burned=300,
+            met_value=8.0
+        )
+        service._invoke_text_model.return_value = "{}"
+
+        await service.analyze("Running for 30 minutes")
+
+        assert service._invoke_text_model.call_args.kwargs["response_schema"] is _EXERCISE_RESPONSE_SCHEMA
+
+    @pytest.mark.asyncio
+    async def test_correct_analysis_passes_response_schema(self, mock_env, service_with_mocks):
+        """Test correction constrains Gemini's output with the exercise response schema."""
+        service = service_with_mocks
+        previous_result = ExerciseAnalysisResult(
+            exercise_type="Running",
+            duration="30 minutes",
+            intensity="Moderate",
+            calories_burned=300,
+            met_value=8.0
+        )
+        service._parse_exercise_analysis_response.return_value = previous_result.model_copy(
+            update={"calories_burned": 350}
+        )
+        service._invoke_text_model.return_value = "{}"
+
+        result = await service.correct_analysis(previous_result, "It was uphill")
+
+        assert result.calories_burned == 350
+        assert result.id == previous_result.id
+        assert service._invoke_text_model.call_args.kwargs["response_schema"] is _EXERCISE_RESPONSE_SCHEMA
+
     @pytest.mark.asyncio
     async def test_analyze_exercise_error(self, mock_env, service_with_mocks, error_exercise_json_response):
         """Test exercise analysis with error response."""
@@ -5,6 +5,7 @@ Tests for the FoodAnalysisService class.
 import os
 import sys
 import json
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from io import BytesIO
@@ -12,7 +13,8 @@ from io import BytesIO
 # Add the project root directory to the Python path so we can import
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
-from api.services.gemini.food_service import FoodAnalysisService
+from api.services.gemini.food_service import FoodAnalysisService, _unique_food_names
+from api.services.gemini.cache import ResponseCache
 from api.services.gemini.exceptions import GeminiServiceException, GeminiParsingError, InvalidImageError
 from api.models.food_analysis import FoodAnalysisResult, Ingredient, NutritionInfo
 
@@ -48,7 +50,7 @@ class TestFoodAnalysisService:
             # Mock the relevant base service methods
             service._invoke_text_model = AsyncMock()
             service._invoke_multimodal_model = AsyncMock()
-            service._read_image_bytes = MagicMock(return_value="base64_encoded_image")
+            service._read_image_bytes = MagicMock(return_value=b"image bytes")
             # Mock the internal prompt generation methods to return predictable values for testing
             service._generate_food_text_analysis_prompt = MagicMock(return_value="Food text analysis prompt for {description}")
             service._generate_food_image_analysis_prompt = MagicMock(return_value="Food image analysis prompt with food in this image")
@@ -230,6 +232,40 @@ class TestFoodAnalysisService:
         assert service._read_image_bytes.called
         assert not service._invoke_multimodal_model.called
 
+    @pytest.mark.asyncio
+    async def test_analyze_by_images_single_request(self, mock_env, service_with_mocks):
+        """Test several images are analyzed with one multimodal request."""
+        service = service_with_mocks
+        service._invoke_multimodal_model_with_images = AsyncMock(
+            return_value='[{"food_name": "Pizza"}, {"food_name": "Salad"}]'
+        )
+
+        results = await service.analyze_by_images([BytesIO(b"a"), BytesIO(b"b")])
+
+        assert [result.food_name for result in results] == ["Pizza", "Salad"]
+        service._invoke_multimodal_model_with_images.assert_awaited_once()
+        assert not service._invoke_multimodal_model.called
+
+    @pytest.mark.asyncio
+    async def test_analyze_by_images_falls_back_per_image(self, mock_env, service_with_mocks):
+        """Test a mismatched batch reply falls back to one request per image."""
+        service = service_with_mocks
+        service._invoke_multimodal_model_with_images = AsyncMock(
+            return_value='[{"food_name": "Pizza"}]'
+        )
+        service._parse_food_analysis_response.return_value = FoodAnalysisResult(food_name="Soup")
+        service._read_image_bytes.side_effect = [
+            b"image a", InvalidImageError("Image file is empty"), b"image b"
+        ]
+
+        results = await service.analyze_by_images(
+            [BytesIO(b"a"), BytesIO(b""), BytesIO(b"b")]
+        )
+
+        assert [result.food_name for result in results] == ["Soup", "Unknown", "Soup"]
+        assert results[1].error == "Image file is empty"
+        assert service._invoke_multimodal_model.await_count == 2
+
     @pytest.mark.asyncio
     async def test_analyze_nutrition_label_success(self, mock_env, service_with_mocks, valid_food_json_response):
         """Test successful nutrition label analysis."""
@@ -301,6 +337,11 @@ class TestFoodAnalysisService:
         # Verify the method was called
         assert service._invoke_text_model.called
         assert service._generate_correction_prompt.called
+        # Verify the previous result is passed as JSON without id/timestamp
+        previous_json = json.loads(service._generate_correction_prompt.call_args[0][0])
+        assert previous_json["food_name"] == "Grill Chicken Salad"
+        assert "id" not in previous_json
+        assert "timestamp" not in previous_json
         assert service._parse_food_analysis_response.called
 
     @pytest.mark.asyncio
@@ -365,6 +406,17 @@ class TestFoodAnalysisService:
             assert "ingredients" in prompt
             assert "nutrition_info" in prompt
 
+    def test_generate_food_text_analysis_prompt_keeps_braces(self, mock_env):
+        """Test braces in a description are passed through literally."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+
+            prompt = service._generate_food_text_analysis_prompt("Rice {large}", "\nContext")
+
+            assert "Carefully analyze this food description: Rice {large}\nContext" in prompt
+            assert '"food_name": "string"' in prompt
+            assert "{{" not in prompt
+
     def test_generate_food_image_analysis_prompt(self, mock_env):
         """Test generating food image analysis prompt."""
         # For this test, we need a real service without the mock method
@@ -400,16 +452,315 @@ class TestFoodAnalysisService:
         with patch('api.services.gemini.food_service.BaseLangChainService'):
             service = FoodAnalysisService()
             
-            # Create previous result dict
-            previous_result = {
+            # Create previous result JSON
+            previous_result = json.dumps({
                 "food_name": "Test Food",
                 "ingredients": [{"name": "Ingredient", "servings": 100}],
                 "nutrition_info": {"calories": 300}
-            }
+            }, indent=2)
             
             prompt = service._generate_correction_prompt(previous_result, "correction comment")
             
             # Verify prompt content
             assert "Test Food" in prompt
             assert "correction comment" in prompt
-            assert "JSON" in prompt 
\ No newline at end of file
+            assert "JSON" in prompt
+
+    def test_generate_food_image_analysis_prompt_is_cached(self, mock_env):
+        """Test the static image prompt is reused rather than rebuilt."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+
+            first = service._generate_food_image_analysis_prompt()
+            second = service._generate_food_image_analysis_prompt()
+
+            assert first is second
+
+    def test_parse_food_analysis_response_strips_wrapping_noise(self, mock_env, valid_food_json_response):
+        """Test parsing a response wrapped in a BOM, XML header and markdown fence."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+            noisy = (
+                '﻿<?xml version="1.0" encoding="UTF-8"?>\n```json\n'
+                + valid_food_json_response
+                + "\n```\n"
+            )
+
+            result = service._parse_food_analysis_response(noisy, "default food")
+
+            assert result.food_name == "Grilled Chicken Salad"
+            assert result.error is None
+
+    @pytest.mark.asyncio
+    async def test_retrieve_relevant_food_data(self, mock_env):
+        """Test RAG retrieval builds context from async Supabase lookups."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+            service._extract_food_names_with_gemini = AsyncMock(return_value=["nasi goreng"])
+
+            query = MagicMock()
+            query.select.return_value = query
+            query.ilike.return_value = query
+            query.limit.return_value = query
+            query.maybe_single.return_value = query
+            query.execute = AsyncMock(
+                return_value=MagicMock(data={"food": "Nasi Goreng", "caloric_value": 250.0})
+            )
+            supabase_client = MagicMock()
+            supabase_client.table.return_value = query
+            service.supabase_client = supabase_client
+
+            cleaned_data, context = await service._retrieve_relevant_food_data("nasi goreng")
+
+            assert cleaned_data[0]["food_name"] == "Nasi Goreng"
+            assert cleaned_data[0]["nutrition_info"]["calories"] == 250.0
+            assert "- Food: Nasi Goreng" in context
+            assert "Calories: 250.0" in context
+            supabase_client.table.assert_called_with("nutrition_data")
+            selected = query.select.call_args[0][0].split(",")
+            assert "*" not in selected
+            assert {"food", "caloric_value", "zinc"} <= set(selected)
+
+    @pytest.mark.asyncio
+    async def test_retrieve_relevant_food_data_without_supabase(self, mock_env):
+        """Test RAG retrieval is skipped when Supabase is not configured."""
+        os.environ.pop("SUPABASE_URL", None)
+        os.environ.pop("SUPABASE_KEY", None)
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+            service._extract_food_names_with_gemini = AsyncMock()
+
+            assert await service._retrieve_relevant_food_data("nasi goreng") == ([], "")
+            assert not service._extract_food_names_with_gemini.called
+
+    def test_extract_nutrition_info(self, mock_env):
+        """Test nutrition info extraction converts every numeric field."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+
+            info = service._extract_nutrition_info({
+                "nutrition_info": {
+                    "calories": 350,
+                    "protein": "25.5",
+                    "fat": 10.0,
+                    "vitamins_and_minerals": {
+                        "vitamin_c": "12",
+                        "calcium": 30,
+                        "iron": "trace",
+                        "zinc": None,
+                    },
+                }
+            })
+
+            assert info.calories == 350.0
+            assert info.protein == 25.5
+            assert info.fat == 10.0
+            assert info.carbs == 0.0
+            assert info.vitamins_and_minerals == {"vitamin_c": 12.0, "calcium": 30.0}
+
+    def test_extract_nutrition_info_missing(self, mock_env):
+        """Test nutrition info extraction defaults when the object is missing."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+
+            assert service._extract_nutrition_info({"nutrition_info": None}) == NutritionInfo()
+
+    def test_unique_food_names(self):
+        """Test duplicate and blank food names are removed before DB lookup."""
+        names = ["Apple", "apple ", "Green apple", "", "APPLE"]
+        assert _unique_food_names(names) == ["Apple", "Green apple"]
+
+    @pytest.mark.asyncio
+    async def test_fetch_nutrition_entry_no_match(self, mock_env):
+        """Test a lookup with no matching row returns None."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+
+            query = MagicMock()
+            query.select.return_value = query
+            query.ilike.return_value = query
+            query.limit.return_value = query
+            query.maybe_single.return_value = query
+            query.execute = AsyncMock(return_value=None)
+            supabase_client = MagicMock()
+            supabase_client.table.return_value = query
+
+            assert await service._fetch_nutrition_entry(supabase_client, "unknown") is None
+
+    @pytest.mark.asyncio
+    async def test_retrieve_skips_rag_when_client_creation_fails(self, mock_env):
+        """Test a failure creating the Supabase client skips RAG instead of raising."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+            service._get_supabase_client = AsyncMock(side_effect=OSError("unreachable"))
+
+            assert await service._retrieve_relevant_food_data("nasi goreng") == ([], "")
+
+    @pytest.mark.asyncio
+    async def test_supabase_client_shared_between_instances(self, mock_env):
+        """Test services with the same credentials share one Supabase client."""
+        os.environ["SUPABASE_URL"] = "https://example.supabase.co"
+        os.environ["SUPABASE_KEY"] = "test-supabase-key"
+        shared_client = MagicMock()
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._SUPABASE_CLIENTS', {}), \
+             patch(
+                 'supabase.create_async_client',
+                 AsyncMock(return_value=shared_client),
+             ) as mock_create:
+            first = await FoodAnalysisService()._get_supabase_client()
+            second = await FoodAnalysisService()._get_supabase_client()
+
+            assert first is shared_client
+            assert second is shared_client
+            mock_create.assert_awaited_once_with(
+                "https://example.supabase.co", "test-supabase-key"
+            )
+
+    def test_supabase_client_created_per_event_loop(self, mock_env):
+        """Test a new event loop gets its own client instead of reusing a dead loop's."""
+        os.environ["SUPABASE_URL"] = "https://example.supabase.co"
+        os.environ["SUPABASE_KEY"] = "test-supabase-key"
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._SUPABASE_CLIENTS', {}), \
+             patch(
+                 'supabase.create_async_client',
+                 AsyncMock(side_effect=lambda *args: MagicMock()),
+             ) as mock_create:
+            service = FoodAnalysisService()
+            first = asyncio.run(service._get_supabase_client())
+            second = asyncio.run(service._get_supabase_client())
+
+            assert first is not second
+            assert mock_create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_supabase_clients(self, mock_env):
+        """Test aclose closes this event loop's shared Supabase clients."""
+        os.environ["SUPABASE_URL"] = "https://example.supabase.co"
+        os.environ["SUPABASE_KEY"] = "test-supabase-key"
+        client = MagicMock()
+        client.postgrest.aclose = AsyncMock()
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._SUPABASE_CLIENTS', {}) as clients, \
+             patch('supabase.create_async_client', AsyncMock(return_value=client)):
+            service = FoodAnalysisService()
+            service.text_llm = service.multimodal_llm = MagicMock(async_client_running=None)
+            await service._get_supabase_client()
+
+            await service.aclose()
+
+            client.postgrest.aclose.assert_awaited_once()
+            assert clients == {}
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_cached(self, mock_env):
+        """Test repeated descriptions reuse the cached food names."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='["nasi goreng", "es teh"]')
+
+            first = await service._extract_food_names_with_gemini("Nasi goreng dan es teh")
+            second = await service._extract_food_names_with_gemini("  nasi goreng dan es teh ")
+
+            assert first == ["nasi goreng", "es teh"]
+            assert second == first
+            service._invoke_text_model.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_failure_not_cached(self, mock_env):
+        """Test unparseable responses are not cached."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(side_effect=["not json", '["sate"]'])
+
+            assert await service._extract_food_names_with_gemini("sate ayam") == []
+            assert await service._extract_food_names_with_gemini("sate ayam") == ["sate"]
+            assert service._invoke_text_model.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_reuses_similar_description(self, mock_env):
+        """Test descriptions differing only in filler words share cached food names."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='["nasi goreng"]')
+
+            await service._extract_food_names_with_gemini("ate nasi goreng")
+            result = await service._extract_food_names_with_gemini("I ate nasi goreng today!")
+
+            assert result == ["nasi goreng"]
+            service._invoke_text_model.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_batches_concurrent_requests(self, mock_env):
+        """Test concurrent extractions are answered by a single batched Gemini call."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='[["nasi goreng"], ["bakso", "es teh"]]')
+
+            results = await asyncio.gather(
+                service._extract_food_names_with_gemini("nasi goreng"),
+                service._extract_food_names_with_gemini("bakso dan es teh"),
+            )
+
+            assert results == [["nasi goreng"], ["bakso", "es teh"]]
+            service._invoke_text_model.assert_awaited_once()
+            prompt = service._invoke_text_model.await_args.args[0]
+            assert '1. "nasi goreng"' in prompt
+            assert '2. "bakso dan es teh"' in prompt
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_retries_malformed_batch_entries(self, mock_env):
+        """Test batch entries that are not lists of names are extracted again on their own."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(
+                side_effect=['[["nasi goreng"], "soto ayam"]', '["soto ayam"]']
+            )
+
+            results = await asyncio.gather(
+                service._extract_food_names_with_gemini("nasi goreng"),
+                service._extract_food_names_with_gemini("soto ayam"),
+            )
+
+            assert results == [["nasi goreng"], ["soto ayam"]]
+            assert service._invoke_text_model.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_rejects_non_list(self, mock_env):
+        """Test a reply that is not a list of names yields no food names."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='"soto ayam"')
+
+            assert await service._extract_food_names_with_gemini("soto ayam") == []
+
+    @pytest.mark.asyncio
+    async def test_request_food_names_quotes_description(self, mock_env):
+        """Test the description is embedded as a JSON string, escaping its quotes."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='["es teh"]')
+
+            assert await service._request_food_names('es teh "manis"') == ["es teh"]
+            assert '"es teh \\"manis\\""' in service._invoke_text_model.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_extract_food_names_normalizes_description(self, mock_env):
+        """Test case, whitespace and Unicode variants share one cache entry and prompt."""
+        with patch('api.services.gemini.food_service.BaseLangChainService'), \
+             patch('api.services.gemini.food_service._FOOD_NAME_CACHE', ResponseCache()):
+            service = FoodAnalysisService()
+            service._invoke_text_model = AsyncMock(return_value='["nasi goreng"]')
+
+            await service._extract_food_names_with_gemini("  Nasi   Goreng\n")
+            await service._extract_food_names_with_gemini("ｎａｓｉ goreng")
+
+            service._invoke_text_model.assert_awaited_once()
+            assert '"nasi goreng"' in service._invoke_text_model.await_args.args[0]
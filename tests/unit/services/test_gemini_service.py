@@ -2,6 +2,7 @@
 Tests for the GeminiService class.
 """
 
+import asyncio
 import os
 import sys
 import json
@@ -62,6 +63,19 @@ class TestGeminiService:
             assert service.food_service is not None
             assert service.exercise_service is not None
 
+    def test_init_shares_models_between_services(self, mock_env):
+        """Test the exercise service reuses the food service's models."""
+        with patch('api.services.gemini_service.FoodAnalysisService') as mock_food, \
+             patch('api.services.gemini_service.ExerciseAnalysisService') as mock_exercise:
+            service = GeminiService()
+
+            food_service = mock_food.return_value
+            mock_exercise.assert_called_once_with(
+                text_llm=food_service.text_llm,
+                multimodal_llm=food_service.multimodal_llm,
+            )
+            assert service.exercise_service is mock_exercise.return_value
+
     @pytest.mark.asyncio
     async def test_check_health(self, mock_env):
         """Test health check functionality."""
@@ -71,6 +85,16 @@ class TestGeminiService:
             result = await service.check_health()
             assert result is True
 
+    @pytest.mark.asyncio
+    async def test_check_health_does_not_reread_environment(self, mock_env):
+        """Test the health check uses the key state captured at initialization."""
+        with patch('api.services.gemini_service.FoodAnalysisService'), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            with patch('api.services.gemini_service.os.getenv') as mock_getenv:
+                assert await service.check_health() is True
+                mock_getenv.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_check_health_api_key_missing(self):
         """Test health check with missing API key."""
@@ -268,4 +292,119 @@ class TestGeminiService:
             with pytest.raises(GeminiServiceException) as exc_info:
                 await service.analyze_food_by_text("Test food")
             
-            assert "API error" in str(exc_info.value) 
\ No newline at end of file
+            assert "API error" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_analyze_food_batch(self, mock_env, mock_food_service):
+        """Test batch analysis returns results in order and isolates failures."""
+        async def analyze(description):
+            if description == "bad":
+                raise GeminiServiceException("Gemini failed")
+            return FoodAnalysisResult(food_name=description)
+
+        mock_food_service.analyze_by_text.side_effect = analyze
+        with patch('api.services.gemini_service.FoodAnalysisService', return_value=mock_food_service), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            results = await service.analyze_food_batch(["apple", "bad", "rice"])
+
+            assert [r.food_name for r in results] == ["apple", "Unknown", "rice"]
+            assert results[1].error == "Gemini failed"
+
+    @pytest.mark.asyncio
+    async def test_analyze_food_by_text_caches_successful_results(self, mock_env, mock_food_service):
+        """Test repeated descriptions are served from the cache with fresh ids."""
+        mock_food_service.analyze_by_text.return_value = FoodAnalysisResult(food_name="Apple")
+        with patch('api.services.gemini_service.FoodAnalysisService', return_value=mock_food_service), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            first = await service.analyze_food_by_text("An apple")
+            second = await service.analyze_food_by_text("  an   APPLE ")
+
+            mock_food_service.analyze_by_text.assert_awaited_once_with("An apple")
+            assert second.food_name == "Apple"
+            assert second.id != first.id
+
+    @pytest.mark.asyncio
+    async def test_analyze_food_by_text_does_not_cache_errors(self, mock_env, mock_food_service):
+        """Test results carrying an error are not cached."""
+        mock_food_service.analyze_by_text.return_value = FoodAnalysisResult(
+            food_name="Unknown", error="No food detected"
+        )
+        with patch('api.services.gemini_service.FoodAnalysisService', return_value=mock_food_service), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            await service.analyze_food_by_text("rock")
+            await service.analyze_food_by_text("rock")
+
+            assert mock_food_service.analyze_by_text.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_analyze_food_by_text_coalesces_concurrent_requests(self, mock_env, mock_food_service):
+        """Test concurrent identical descriptions share one analysis with distinct ids."""
+        async def analyze(description):
+            await asyncio.sleep(0.01)
+            return FoodAnalysisResult(food_name="Apple", error="not cached")
+
+        mock_food_service.analyze_by_text.side_effect = analyze
+        with patch('api.services.gemini_service.FoodAnalysisService', return_value=mock_food_service), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            first, second = await asyncio.gather(
+                service.analyze_food_by_text("apple"), service.analyze_food_by_text("Apple")
+            )
+
+            assert mock_food_service.analyze_by_text.await_count == 1
+            assert first.food_name == second.food_name == "Apple"
+            assert first.id != second.id
+
+    @pytest.mark.asyncio
+    async def test_coalesced_results_share_no_nested_state(self, mock_env, mock_food_service):
+        """Test callers joining a coalesced analysis get their own ingredients and nutrients."""
+        async def analyze(description):
+            await asyncio.sleep(0.01)
+            return FoodAnalysisResult(
+                food_name="Apple",
+                ingredients=[Ingredient(name="Apple", servings=100)],
+                nutrition_info=NutritionInfo(vitamins_and_minerals={"vitamin_c": 5.0}),
+                error="not cached",
+            )
+
+        mock_food_service.analyze_by_text.side_effect = analyze
+        with patch('api.services.gemini_service.FoodAnalysisService', return_value=mock_food_service), \
+             patch('api.services.gemini_service.ExerciseAnalysisService'):
+            service = GeminiService()
+            first, second = await asyncio.gather(
+                service.analyze_food_by_text("apple"), service.analyze_food_by_text("apple")
+            )
+
+            first.ingredients[0].servings = 200
+            first.ingredients.append(Ingredient(name="Honey"))
+            first.nutrition_info.vitamins_and_minerals["vitamin_c"] = 9.0
+
+            assert [i.servings for i in second.ingredients] == [100]
+            assert second.nutrition_info.vitamins_and_minerals == {"vitamin_c": 5.0}
+
+    @pytest.mark.asyncio
+    async def test_analyze_exercise_batch(self, mock_env, mock_exercise_service):
+        """Test exercise batch analysis keeps order and isolates failures."""
+        async def analyze(description, *metrics):
+            if description == "bad":
+                raise GeminiServiceException("Gemini failed")
+            return ExerciseAnalysisResult(
+                exercise_type=description,
+                calories_burned=100,
+                duration="10 minutes",
+                intensity="Low",
+                met_value=3.0,
+            )
+
+        mock_exercise_service.analyze.side_effect = analyze
+        with patch('api.services.gemini_service.FoodAnalysisService'), \
+             patch('api.services.gemini_service.ExerciseAnalysisService', return_value=mock_exercise_service):
+            service = GeminiService()
+            results = await service.analyze_exercise_batch(["walk", "bad"], user_weight_kg=60)
+
+            assert [r.exercise_type for r in results] == ["walk", "unknown"]
+            assert results[1].error == "Gemini failed"
+            mock_exercise_service.analyze.assert_any_await("walk", 60, None, None, None)
@@ -7,8 +7,11 @@ import pytest
 from api.services.gemini.utils.json_parser import (
     extract_json_from_text,
     parse_json_safely,
+    try_parse_json_fast,
+    try_parse_embedded_json,
     fix_common_json_errors,
     extract_fields,
+    JsonCompletionScanner,
 )
 from api.services.gemini.exceptions import GeminiParsingError
 
@@ -46,12 +49,39 @@ class TestJsonParser:
         result = extract_json_from_text(text)
         assert result == '{"outer": {"inner": "value"}}'
 
+    def test_extract_json_from_text_braces_in_strings(self):
+        """Test that brackets inside strings and trailing text are ignored."""
+        text = 'Result: {"name": "a } b", "note": "say \\"{\\""} and {more}'
+        result = extract_json_from_text(text)
+        assert result == '{"name": "a } b", "note": "say \\"{\\""}'
+
+    def test_extract_json_from_text_truncated(self):
+        """Test that an unclosed object is returned up to the end of the text."""
+        text = 'Text {"outer": {"inner": [1, 2'
+        result = extract_json_from_text(text)
+        assert result == '{"outer": {"inner": [1, 2'
+
     def test_extract_json_from_text_no_json(self):
         """Test extracting when no JSON is present."""
         text = "Just plain text"
         result = extract_json_from_text(text)
         assert result is None
 
+    def test_try_parse_json_fast(self):
+        """Test the fast path only accepts text that is a clean JSON object."""
+        assert try_parse_json_fast(' {"key": "value"}\n') == {"key": "value"}
+        assert try_parse_json_fast('Here: {"key": "value"}') is None
+        assert try_parse_json_fast('{"key": "value",}') is None
+        assert try_parse_json_fast('[{"key": "value"}]') is None
+
+    def test_try_parse_embedded_json(self):
+        """Test a valid object is parsed directly out of surrounding text."""
+        assert try_parse_embedded_json('Here: {"key": "value"} done') == {"key": "value"}
+        assert try_parse_embedded_json('```json\n{"key": "}"}\n```') == {"key": "}"}
+        assert try_parse_embedded_json('{"a": 1} and {"b": 2}') is None
+        assert try_parse_embedded_json('{"key": "value",}') is None
+        assert try_parse_embedded_json("no json") is None
+
     def test_parse_json_safely_valid(self):
         """Test parsing valid JSON."""
         json_str = '{"key": "value"}'
@@ -64,6 +94,22 @@ class TestJsonParser:
         with pytest.raises(GeminiParsingError):
             parse_json_safely(json_str)
 
+    def test_parse_json_safely_targeted_repair(self):
+        """Test a single-defect payload is fixed without the full repair pipeline."""
+        json_str = '{"note": "", "items": [1, 2,],}'
+        assert parse_json_safely(json_str) == {"note": "", "items": [1, 2]}
+
+        json_str = "{'food_name': 'Rice', 'items': [1, 2]}"
+        assert parse_json_safely(json_str) == {"food_name": "Rice", "items": [1, 2]}
+
+    def test_parse_json_safely_truncated(self):
+        """Test the complete part of a truncated document is recovered."""
+        json_str = '{"food_name": "Rice", "ingredients": [{"name": "rice", "serv'
+        assert parse_json_safely(json_str) == {
+            "food_name": "Rice",
+            "ingredients": [{"name": "rice"}],
+        }
+
     def test_parse_json_safely_empty(self):
         """Test parsing empty JSON string."""
         with pytest.raises(GeminiParsingError):
@@ -75,6 +121,12 @@ class TestJsonParser:
         fixed = fix_common_json_errors(json_str)
         assert fixed == '{"key": "value"}'
 
+    def test_fix_common_json_errors_smart_quotes(self):
+        """Test fixing typographic quotes in JSON."""
+        json_str = "{\u201ckey\u201d: \u2018value\u2019}"
+        fixed = fix_common_json_errors(json_str)
+        assert fixed == '{"key": "value"}'
+
     def test_fix_common_json_errors_trailing_comma(self):
         """Test fixing trailing commas in JSON."""
         json_str = '{"key": "value",}'
@@ -93,12 +145,24 @@ class TestJsonParser:
         fixed = fix_common_json_errors(json_str)
         assert fixed == '{"key": "value"}'
 
+    def test_fix_common_json_errors_preserves_string_contents(self):
+        """Test that comma and colon fixes leave string values untouched."""
+        json_str = '{"time": "12::30, }", "items": [1, 2,]}'
+        fixed = fix_common_json_errors(json_str)
+        assert fixed == '{"time": "12::30, }", "items": [1, 2]}'
+
     def test_fix_common_json_errors_missing_brackets(self):
         """Test fixing missing brackets in JSON."""
         json_str = '{"key": "value"'
         fixed = fix_common_json_errors(json_str)
         assert fixed == '{"key": "value"}'
 
+    def test_fix_common_json_errors_missing_nested_brackets(self):
+        """Test missing closers are added innermost first."""
+        json_str = '{"items": [{"name": "rice"'
+        fixed = fix_common_json_errors(json_str)
+        assert fixed == '{"items": [{"name": "rice"}]}'
+
     def test_fix_common_json_errors_escaped_quotes(self):
         """Test fixing escaped quotes in JSON."""
         json_str = '{"key": "\\"value\\""}'
@@ -132,4 +196,12 @@ class TestJsonParser:
         """Test extracting with invalid path."""
         data = {"key": "value"}
         result = extract_fields(data, "key.missing", default="default")
-        assert result == "default" 
\ No newline at end of file
+        assert result == "default"
+
+    def test_json_completion_scanner_across_chunks(self):
+        """Test the scanner detects the end of JSON split across chunks."""
+        scanner = JsonCompletionScanner()
+        assert scanner.feed('Here you go: {"name": "a}') is False
+        assert scanner.feed('\\"b", "items": [1, ') is False
+        assert scanner.feed("2]}") is True
+        assert scanner.feed(" trailing text") is True
@@ -0,0 +1,31 @@
+"""
+Tests for the prompt template utilities.
+"""
+
+import pytest
+
+from api.services.gemini.utils.prompts import PreparedPrompt
+
+
+class TestPreparedPrompt:
+    """Test suite for the PreparedPrompt class."""
+
+    def test_matches_str_format(self):
+        """Test rendering is identical to str.format, including brace escapes."""
+        template = 'Input: "{description}"\n{{"servings": {servings}}}\n{description}'
+        prompt = PreparedPrompt(template)
+
+        values = {"description": "nasi {goreng}", "servings": 1.5}
+        assert prompt.format(**values) == template.format(**values)
+
+    def test_missing_value_raises(self):
+        """Test a field without a value raises KeyError like str.format."""
+        with pytest.raises(KeyError):
+            PreparedPrompt("{description}").format()
+
+    def test_rejects_unsupported_fields(self):
+        """Test positional fields and format specs are rejected."""
+        with pytest.raises(ValueError):
+            PreparedPrompt("{}")
+        with pytest.raises(ValueError):
+            PreparedPrompt("{servings:.1f}")